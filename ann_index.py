@@ -0,0 +1,243 @@
+"""
+ANN Index
+Inverted-file (IVF) approximate nearest-neighbour index over a VectorStore
+"""
+import json
+import os
+import threading
+import uuid
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vector_store import VectorStore
+
+KMEANS_ITERATIONS = 10
+# Rows assigned to centroids per matrix product, to bound the size of the score matrix
+ASSIGN_BATCH_ROWS = 65536
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def train_centroids(vectors: np.ndarray, nlist: int, iterations: int = KMEANS_ITERATIONS,
+                    seed: int = 0) -> np.ndarray:
+    """Spherical k-means: unit-length centroids that maximize cosine similarity to their members"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = np.bincount(assignment, minlength=nlist) == 0
+        # Restart empty clusters from random members so every list gets used
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums).astype(np.float32)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index: vectors are bucketed by their nearest of `nlist`
+    k-means centroids, and a query scans only the `nprobe` buckets whose
+    centroids are closest to it. Raising nprobe trades latency for recall;
+    nprobe == nlist is an exact search.
+
+    The centroids are trained once the store holds `train_size` vectors;
+    until then searches fall back to the store's exact scan. Vectors added
+    afterwards are assigned to their bucket as they arrive, so the index is
+    built incrementally and never retrained.
+
+    Buckets are saved in CSR form (offsets plus row ids grouped by bucket)
+    as .npy files and reopened with memory mapping, so a restart maps the
+    index instead of rebuilding it. Rows assigned since the last save are
+    kept in a small in-memory tail and merged in on the next `save`.
+    Each save writes a new generation of files and switches to it by
+    atomically replacing the metadata file.
+
+    `add` and `save` are serialized by their own lock and do their work,
+    including k-means training and the fsyncs of a save, without holding
+    the lock that searches take. Searches may run alongside either: they
+    take a consistent copy of the buckets under a short lock and score
+    outside it, and new buckets are swapped in under that lock.
+    """
+
+    def __init__(self, store: VectorStore, nlist: int, train_size: int, directory: Optional[str] = None,
+                 save_every: int = 10000):
+        self.store = store
+        self.nlist = nlist
+        self.train_size = max(train_size, nlist)
+        self.directory = directory
+        self.save_every = save_every
+        self.centroids: Optional[np.ndarray] = None
+        self._offsets = np.zeros(nlist + 1, dtype=np.int64)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._tail_ids = array("q")
+        self._tail_lists = array("q")
+        self._indexed = 0
+        self._generation: Optional[str] = None
+        self._lock = threading.Lock()
+        # Serializes add and save, which may take seconds; searches never wait on it
+        self._update_lock = threading.Lock()
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "ivf.json")
+
+    def _array_path(self, generation: str, name: str) -> str:
+        return os.path.join(self.directory, f"ivf-{generation}-{name}.npy")
+
+    def load(self) -> None:
+        """Map the saved index, if there is one matching the store, then index any newer rows"""
+        if self.directory is not None:
+            with self._update_lock:
+                self._map_saved()
+        self.add()
+
+    def _map_saved(self) -> None:
+        try:
+            with open(self._meta_path(), encoding="utf-8") as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            return
+        if meta["key"] != self.store.key or meta["nlist"] != self.nlist or meta["indexed"] > len(self.store):
+            # Built for other vectors, or for rows the store no longer has
+            return
+        generation = meta["generation"]
+        self.centroids = np.load(self._array_path(generation, "centroids"), mmap_mode="r")
+        self._offsets = np.load(self._array_path(generation, "offsets"), mmap_mode="r")
+        self._ids = np.load(self._array_path(generation, "ids"), mmap_mode="r")
+        self._indexed = meta["indexed"]
+        self._generation = generation
+
+    def _assign_new_rows(self, limit: int) -> None:
+        """Bucket the store rows past the indexed ones, up to `limit`"""
+        vectors = self.store.snapshot()[:limit]
+        for start in range(self._indexed, len(vectors), ASSIGN_BATCH_ROWS):
+            batch = vectors[start:start + ASSIGN_BATCH_ROWS]
+            lists = np.argmax(batch @ self.centroids.T, axis=1)
+            with self._lock:
+                self._tail_ids.extend(range(start, start + len(batch)))
+                self._tail_lists.extend(lists.tolist())
+        self._indexed = len(vectors)
+
+    def add(self, limit: Optional[int] = None) -> None:
+        """
+        Index the store rows added since the last call, training the centroids when enough exist.
+
+        Only rows before `limit` (default: all of them) are indexed, so
+        rows that may still be rolled back can be left out.
+        """
+        with self._update_lock:
+            limit = len(self.store) if limit is None else min(limit, len(self.store))
+            if not self.trained:
+                if limit < self.train_size:
+                    return
+                vectors = self.store.snapshot()[:limit]
+                sample = np.random.default_rng(0).choice(len(vectors), self.train_size, replace=False)
+                centroids = train_centroids(vectors[np.sort(sample)], self.nlist)
+                with self._lock:
+                    self.centroids = centroids
+                self._assign_new_rows(limit)
+                self._save()
+                return
+            self._assign_new_rows(limit)
+            if self.pending >= self.save_every:
+                self._save()
+
+    def search(self, query: np.ndarray, k: int, nprobe: int) -> List[Tuple[int, float]]:
+        """Return up to `k` (row, cosine similarity) pairs from the `nprobe` closest buckets, best first"""
+        with self._lock:
+            centroids, offsets, ids = self.centroids, self._offsets, self._ids
+            # Copies, so `add` can keep extending the tail while this search runs
+            tail_ids = np.array(self._tail_ids, dtype=np.int64)
+            tail_lists = np.array(self._tail_lists, dtype=np.int64)
+        if centroids is None:
+            return self.store.search(query, k)[0]
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        nprobe = min(nprobe, self.nlist)
+        probes = np.argpartition(centroids @ query, self.nlist - nprobe)[self.nlist - nprobe:]
+
+        candidates = [ids[offsets[probe]:offsets[probe + 1]] for probe in probes]
+        candidates.append(tail_ids[np.isin(tail_lists, probes)])
+        rows = np.concatenate(candidates)
+        if not len(rows):
+            return []
+
+        scores = self.store.snapshot()[rows] @ query
+        if k < len(rows):
+            top = np.argpartition(scores, len(rows) - k)[len(rows) - k:]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def save(self) -> None:
+        """Merge the in-memory tail into the buckets and, with a directory, write them as a new generation"""
+        with self._update_lock:
+            self._save()
+
+    def _save(self) -> None:
+        if not self.trained:
+            return
+        lists = np.repeat(np.arange(self.nlist), np.diff(self._offsets))
+        ids = np.concatenate([self._ids, np.frombuffer(self._tail_ids, dtype=np.int64)])
+        lists = np.concatenate([lists, np.frombuffer(self._tail_lists, dtype=np.int64)])
+        order = np.argsort(lists, kind="stable")
+        ids = ids[order]
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(lists, minlength=self.nlist))]).astype(np.int64)
+
+        if self.directory is None:
+            with self._lock:
+                self._offsets, self._ids = offsets, ids
+                self._tail_ids, self._tail_lists = array("q"), array("q")
+            return
+
+        generation = uuid.uuid4().hex[:12]
+        os.makedirs(self.directory, exist_ok=True)
+        for name, values in (("centroids", np.asarray(self.centroids)), ("offsets", offsets), ("ids", ids)):
+            with open(self._array_path(generation, name), "wb") as handle:
+                np.save(handle, values)
+                handle.flush()
+                os.fsync(handle.fileno())
+        meta = {"key": self.store.key, "nlist": self.nlist, "indexed": self._indexed, "generation": generation}
+        temp_path = self._meta_path() + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump(meta, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, self._meta_path())
+
+        previous, self._generation = self._generation, generation
+        centroids = np.load(self._array_path(generation, "centroids"), mmap_mode="r")
+        offsets = np.load(self._array_path(generation, "offsets"), mmap_mode="r")
+        ids = np.load(self._array_path(generation, "ids"), mmap_mode="r")
+        with self._lock:
+            self.centroids, self._offsets, self._ids = centroids, offsets, ids
+            self._tail_ids, self._tail_lists = array("q"), array("q")
+        # Searches still holding the old mappings keep reading them after the files are unlinked
+        if previous is not None:
+            for name in ("centroids", "offsets", "ids"):
+                try:
+                    os.remove(self._array_path(previous, name))
+                except OSError:
+                    pass
+
+    @property
+    def pending(self) -> int:
+        """Rows assigned since the last save"""
+        return len(self._tail_ids)
+
+    def stats(self) -> Dict:
+        return {
+            "type": "ivf",
+            "nlist": self.nlist,
+            "trained": self.trained,
+            "indexed": self._indexed,
+            "pending": self.pending,
+        }
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Text Summarization Service
+
+Runs a fixed, seeded corpus (1 KB to 10 MB) through each summarization
+strategy, in-process and/or over HTTP, and writes a JSON report with
+latency percentiles, throughput, peak RSS and simple quality figures.
+
+Examples:
+    python benchmark_summarization.py --modes inprocess
+    python benchmark_summarization.py --modes http --url http://localhost:8001 --server-pid 1234
+    python benchmark_summarization.py --sizes 1KB,10KB --compare benchmark_report.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+# In-process runs must neither read nor update the service's corpus IDF store: scoring would switch
+# to corpus IDF partway through a run, and the benchmark would pollute the real store
+os.environ["IDF_STORE_PATH"] = ""
+
+from language_support import get_language
+from text_summarization import mock_summarize_text
+
+REPORT_VERSION = 1
+CORPUS_SEED = 20240101
+
+# Input sizes in bytes; the corpus is ASCII so characters == bytes
+CORPUS_SIZES = {
+    "1KB": 1024,
+    "10KB": 10 * 1024,
+    "100KB": 100 * 1024,
+    "1MB": 1024 * 1024,
+    "10MB": 10 * 1024 * 1024,
+}
+DEFAULT_STRATEGIES = ("simple", "tfidf", "textrank")
+LARGE_INPUT_BYTES = 1024 * 1024
+QUALITY_TOP_TERMS = 20
+RSS_SAMPLE_INTERVAL = 0.005
+
+_TOPICS = [
+    "neural network training gradient optimizer weights layers",
+    "database index query transaction storage replication",
+    "climate ocean temperature carbon emissions policy",
+    "market inflation interest rates investors growth",
+    "protein cell gene sequencing mutation therapy",
+    "compiler parser syntax runtime memory allocation",
+    "satellite orbit launch telescope galaxy observation",
+    "soil crops irrigation harvest farmers yield",
+]
+_FILLER = (
+    "the a this that these its their our new recent early later several many most some "
+    "researchers engineers teams analysts studies reports results experiments systems methods "
+    "shows suggests improves reduces increases explains measures describes compares supports "
+    "significantly slightly clearly often rarely quickly carefully across within during after "
+    "before between under over through significant important complex simple large small"
+).split()
+
+
+def build_document(size: int, seed: int = CORPUS_SEED) -> str:
+    """
+    Generate a deterministic English-like document of exactly `size` characters.
+
+    Paragraphs each follow one topic, so the extractive strategies have
+    real term structure to rank rather than uniform noise.
+    """
+    rng = random.Random(seed + size)
+    topics = [topic.split() for topic in _TOPICS]
+    paragraphs: List[str] = []
+    length = 0
+    while length < size:
+        topic = rng.choice(topics)
+        sentences = []
+        for _ in range(rng.randint(3, 7)):
+            words = [
+                rng.choice(topic) if rng.random() < 0.35 else rng.choice(_FILLER)
+                for _ in range(rng.randint(8, 22))
+            ]
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+    return "\n\n".join(paragraphs)[:size]
+
+
+def read_rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+    """Current resident set size of a process, from /proc where available"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid is None:
+        try:
+            import resource
+        except ImportError:
+            # Windows has neither /proc nor getrusage
+            return None
+        # Lifetime peak only: kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    return None
+
+
+class PeakRSSSampler:
+    """Sample a process's RSS on a background thread and keep the peak"""
+
+    def __init__(self, pid: Optional[int] = None, interval: float = RSS_SAMPLE_INTERVAL):
+        self.pid = pid
+        self.interval = interval
+        self.peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self) -> None:
+        rss = read_rss_bytes(self.pid)
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "PeakRSSSampler":
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def term_coverage(text: str, summary: str) -> float:
+    """Fraction of the document's most frequent content terms that appear in the summary"""
+    tokenize = get_language("en").tokenize
+    top_terms = [term for term, _ in Counter(tokenize(text.lower())).most_common(QUALITY_TOP_TERMS)]
+    if not top_terms:
+        return 0.0
+    summary_terms = set(tokenize(summary.lower()))
+    return round(sum(1 for term in top_terms if term in summary_terms) / len(top_terms), 4)
+
+
+def run_case(summarize: Callable[[str], str], text: str, iterations: int, warmup: int,
+             rss_pid: Optional[int], measure_rss: bool) -> Dict:
+    """Time `iterations` calls of `summarize` on `text` after `warmup` untimed calls"""
+    summary = ""
+    for _ in range(warmup):
+        summary = summarize(text)
+
+    latencies: List[float] = []
+    sampler = PeakRSSSampler(rss_pid) if measure_rss else None
+    started = time.perf_counter()
+    with sampler or nullcontext():
+        for _ in range(iterations):
+            begin = time.perf_counter()
+            summary = summarize(text)
+            latencies.append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - started
+    peak_rss = sampler.peak if sampler else None
+
+    latency_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latency_ms, [50, 95, 99])
+    return {
+        "iterations": iterations,
+        "latency_ms": {
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "mean": round(float(latency_ms.mean()), 3),
+            "min": round(float(latency_ms.min()), 3),
+            "max": round(float(latency_ms.max()), 3),
+        },
+        "throughput": {
+            "requests_per_s": round(iterations / elapsed, 3),
+            "mb_per_s": round(iterations * len(text) / elapsed / (1024 * 1024), 3),
+        },
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 2) if peak_rss is not None else None,
+        "quality": {
+            "term_coverage": term_coverage(text, summary),
+            "compression": round(len(summary) / len(text), 6),
+        },
+    }
+
+
+def inprocess_summarizer(strategy: str) -> Callable[[str], str]:
+    return lambda text: mock_summarize_text(text, strategy)
+
+
+def http_summarizer(client: httpx.Client, url: str, strategy: str, map_reduce: bool) -> Callable[[str], str]:
+    """Call POST /summarize; each call gets a unique lead sentence so the summary cache never answers"""
+    counter = itertools.count()
+
+    def summarize(text: str) -> str:
+        payload = {
+            "text": f"Benchmark request {next(counter)}. {text}",
+            "strategy": strategy,
+            "map_reduce": map_reduce,
+        }
+        response = client.post(f"{url}/summarize", json=payload)
+        response.raise_for_status()
+        return response.json()["summary"]
+
+    return summarize
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_reports(previous: Dict, current: Dict) -> None:
+    """Print p50/p95 latency and throughput changes against an earlier report"""
+    def key(result: Dict):
+        return result["mode"], result["strategy"], result["size"]
+
+    baseline = {key(result): result for result in previous.get("results", [])}
+    print(f"\nComparison with {previous.get('environment', {}).get('git_commit') or 'previous report'}:")
+    print(f"{'mode':<10} {'strategy':<9} {'size':<6} {'p50 Δ%':>9} {'p95 Δ%':>9} {'MB/s Δ%':>9}")
+    for result in current["results"]:
+        old = baseline.get(key(result))
+        if old is None:
+            continue
+
+        def change(new_value: float, old_value: float) -> str:
+            return f"{(new_value - old_value) / old_value * 100:+.1f}" if old_value else "n/a"
+
+        print(
+            f"{result['mode']:<10} {result['strategy']:<9} {result['size']:<6} "
+            f"{change(result['latency_ms']['p50'], old['latency_ms']['p50']):>9} "
+            f"{change(result['latency_ms']['p95'], old['latency_ms']['p95']):>9} "
+            f"{change(result['throughput']['mb_per_s'], old['throughput']['mb_per_s']):>9}"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the text summarization strategies")
+    parser.add_argument("--modes", default="inprocess", help="Comma-separated: inprocess, http")
+    parser.add_argument("--strategies", default=",".join(DEFAULT_STRATEGIES), help="Comma-separated strategies")
+    parser.add_argument("--sizes", default=",".join(CORPUS_SIZES), help=f"Comma-separated from {', '.join(CORPUS_SIZES)}")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed runs per case for inputs under 1MB")
+    parser.add_argument("--large-iterations", type=int, default=3, help="Timed runs per case for inputs of 1MB or more")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs before each case")
+    parser.add_argument("--url", default="http://localhost:8001", help="Service URL for http mode")
+    parser.add_argument("--server-pid", type=int, default=None, help="Service PID, to sample its RSS in http mode")
+    parser.add_argument("--map-reduce", action="store_true", help="Request map-reduce summaries in http mode")
+    parser.add_argument("--timeout", type=float, default=300.0, help="HTTP timeout in seconds")
+    parser.add_argument("--output", default="benchmark_report.json", help="Where to write the JSON report")
+    parser.add_argument("--compare", default=None, help="Earlier report to compare against")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    modes = [mode for mode in args.modes.split(",") if mode]
+    strategies = [strategy for strategy in args.strategies.split(",") if strategy]
+    sizes = [size for size in args.sizes.split(",") if size]
+    for size in sizes:
+        if size not in CORPUS_SIZES:
+            sys.exit(f"Unknown size '{size}' (available: {', '.join(CORPUS_SIZES)})")
+    for mode in modes:
+        if mode not in ("inprocess", "http"):
+            sys.exit(f"Unknown mode '{mode}' (available: inprocess, http)")
+
+    report = {
+        "benchmark": "text_summarization",
+        "report_version": REPORT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "modes": modes,
+            "strategies": strategies,
+            "sizes": sizes,
+            "iterations": args.iterations,
+            "large_iterations": args.large_iterations,
+            "warmup": args.warmup,
+            "corpus_seed": CORPUS_SEED,
+            "url": args.url if "http" in modes else None,
+            "map_reduce": args.map_reduce,
+        },
+        "results": [],
+    }
+
+    client = httpx.Client(timeout=args.timeout) if "http" in modes else None
+    try:
+        for size in sizes:
+            text = build_document(CORPUS_SIZES[size])
+            iterations = args.large_iterations if len(text) >= LARGE_INPUT_BYTES else args.iterations
+            for mode in modes:
+                for strategy in strategies:
+                    if mode == "http":
+                        summarize = http_summarizer(client, args.url, strategy, args.map_reduce)
+                        rss_pid, measure_rss = args.server_pid, args.server_pid is not None
+                    else:
+                        summarize = inprocess_summarizer(strategy)
+                        rss_pid, measure_rss = None, True
+
+                    print(f"{mode:<10} {strategy:<9} {size:<6}", end=" ", flush=True)
+                    result = run_case(summarize, text, iterations, args.warmup, rss_pid, measure_rss)
+                    report["results"].append({
+                        "mode": mode, "strategy": strategy, "size": size, "input_bytes": len(text), **result
+                    })
+                    latency = result["latency_ms"]
+                    print(
+                        f"p50={latency['p50']:.1f}ms p95={latency['p95']:.1f}ms p99={latency['p99']:.1f}ms "
+                        f"{result['throughput']['mb_per_s']:.2f}MB/s rss={result['peak_rss_mb']}MB"
+                    )
+    finally:
+        if client is not None:
+            client.close()
+
+    with open(args.output, "w") as handle:
+        json.dump(report, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+    print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            compare_reports(json.load(handle), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Document Extraction
+Format detection and incremental text extraction for PDF, DOCX and TXT uploads
+"""
+import asyncio
+import codecs
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import Executor
+from itertools import islice
+from typing import AsyncIterator, List, Optional
+
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+PDF_MAX_TASKS_IN_FLIGHT = int(os.getenv("PDF_MAX_TASKS_IN_FLIGHT", "8"))
+DOCX_PARAGRAPHS_PER_PIECE = 200
+TEXT_READ_SIZE = 1024 * 1024
+
+# Appended to pages and paragraphs so sentence segmentation sees a paragraph break
+PIECE_SEPARATOR = "\n\n"
+
+
+class DocumentExtractionError(Exception):
+    """Raised when a document cannot be decoded; the message is safe to return to clients"""
+
+
+def detect_document_format(path: str, filename: Optional[str] = None) -> str:
+    """Detect the document format from its leading bytes, falling back to the file extension"""
+    with open(path, "rb") as handle:
+        head = handle.read(8)
+
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return "docx"
+        except zipfile.BadZipFile:
+            pass
+        raise DocumentExtractionError("Unsupported archive format (expected a .docx document)")
+
+    extension = filename.rsplit(".", 1)[-1].lower() if filename and "." in filename else ""
+    if extension in ("pdf", "docx"):
+        raise DocumentExtractionError(f"File does not look like a valid {extension.upper()} document")
+    return "txt"
+
+
+def count_pdf_pages(path: str) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+def extract_pdf_page_range(path: str, start: int, stop: int) -> str:
+    """Extract the text of pages [start, stop) in a worker process"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return PIECE_SEPARATOR.join(reader.pages[i].extract_text() or "" for i in range(start, stop))
+
+
+def read_docx_paragraphs(path: str) -> List[str]:
+    import docx
+
+    return [paragraph.text for paragraph in docx.Document(path).paragraphs if paragraph.text.strip()]
+
+
+async def iter_pdf_text(path: str, executor: Executor) -> AsyncIterator[str]:
+    """
+    Decode PDF pages in parallel and yield their text in page order.
+
+    Page ranges are submitted to `executor` with at most
+    PDF_MAX_TASKS_IN_FLIGHT outstanding, so decoded text is handed on as
+    soon as the next range in order completes and never piles up in memory.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        page_count = await loop.run_in_executor(None, count_pdf_pages, path)
+    except Exception as e:
+        raise DocumentExtractionError(f"Could not read PDF: {str(e)}") from e
+
+    ranges = iter(
+        (start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    )
+    window = deque(
+        loop.run_in_executor(executor, extract_pdf_page_range, path, start, stop)
+        for start, stop in islice(ranges, PDF_MAX_TASKS_IN_FLIGHT)
+    )
+    try:
+        while window:
+            text = await window.popleft()
+            next_range = next(ranges, None)
+            if next_range is not None:
+                window.append(loop.run_in_executor(executor, extract_pdf_page_range, path, *next_range))
+            if text.strip():
+                yield text + PIECE_SEPARATOR
+    except Exception as e:
+        raise DocumentExtractionError(f"Could not extract PDF text: {str(e)}") from e
+    finally:
+        for pending in window:
+            pending.cancel()
+
+
+async def iter_docx_text(path: str) -> AsyncIterator[str]:
+    """Yield DOCX paragraphs in batches"""
+    loop = asyncio.get_running_loop()
+    try:
+        paragraphs = await loop.run_in_executor(None, read_docx_paragraphs, path)
+    except Exception as e:
+        raise DocumentExtractionError(f"Could not read DOCX: {str(e)}") from e
+
+    for start in range(0, len(paragraphs), DOCX_PARAGRAPHS_PER_PIECE):
+        yield PIECE_SEPARATOR.join(paragraphs[start:start + DOCX_PARAGRAPHS_PER_PIECE]) + PIECE_SEPARATOR
+
+
+async def iter_plain_text(path: str, encoding: str = "utf-8") -> AsyncIterator[str]:
+    """Yield a text file in fixed-size decoded pieces"""
+    loop = asyncio.get_running_loop()
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    with open(path, "rb") as handle:
+        while True:
+            chunk = await loop.run_in_executor(None, handle.read, TEXT_READ_SIZE)
+            if not chunk:
+                break
+            yield decoder.decode(chunk)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_document_text(path: str, document_format: str, executor: Executor) -> AsyncIterator[str]:
+    """
+    Stream the text of a document stored at `path`.
+
+    PDF pages are decoded in parallel on `executor`. Pieces are yielded in
+    document order as they become available and concatenate directly into
+    the full text; page and paragraph pieces end with a paragraph break.
+    """
+    if document_format == "pdf":
+        return iter_pdf_text(path, executor)
+    if document_format == "docx":
+        return iter_docx_text(path)
+    if document_format == "txt":
+        return iter_plain_text(path)
+    raise DocumentExtractionError(f"Unsupported document format: {document_format}")
@@ -0,0 +1,527 @@
+"""
+Document Index
+Chunked multi-document corpus with an inverted index and BM25 passage retrieval
+"""
+import json
+import math
+import os
+import threading
+import uuid
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ann_index import IVFIndex
+from embeddings import Embedder, embedder_key
+from language_support import detect_language, get_language
+from sentence_segmenter import iter_chunk_spans
+from vector_store import VectorStore
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Reciprocal-rank fusion damping: larger values flatten the advantage of the very top ranks
+RRF_K = 60
+
+
+class Chunk(NamedTuple):
+    """A passage of a document: its position in the document and its character offsets"""
+    document_id: str
+    index: int
+    start: int
+    end: int
+
+
+class Passage(NamedTuple):
+    """A retrieved chunk with its score; `index` is the chunk's position in its document"""
+    chunk_id: int
+    score: float
+    document_id: str
+    index: int
+    filename: str
+    text: str
+
+    @property
+    def source(self) -> str:
+        """Stable chunk identifier: the document id and the chunk's index in it"""
+        return f"{self.document_id}:{self.index}"
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Passage]], k: int, rrf_k: int = RRF_K) -> List[Passage]:
+    """
+    Merge ranked passage lists into one: each passage scores the sum of
+    1 / (rrf_k + rank) over the lists it appears in, so only ranks matter
+    and BM25 and cosine scores never have to be put on the same scale.
+    """
+    fused: Dict[int, float] = {}
+    passages: Dict[int, Passage] = {}
+    for ranking in rankings:
+        for rank, passage in enumerate(ranking, start=1):
+            fused[passage.chunk_id] = fused.get(passage.chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+            passages.setdefault(passage.chunk_id, passage)
+    best = sorted(fused, key=lambda chunk_id: (-fused[chunk_id], chunk_id))[:k]
+    return [passages[chunk_id]._replace(score=fused[chunk_id]) for chunk_id in best]
+
+
+class InvertedIndex:
+    """
+    Term -> posting list index over chunks, scored with BM25.
+
+    Each posting list holds parallel arrays of chunk ids and term
+    frequencies, appended to as chunks are added. A query only reads the
+    posting lists of its own terms, so its cost depends on how common
+    those terms are rather than on the size of the corpus.
+
+    `save` writes the posting lists as flat arrays and `load` reads them
+    back, so a restart does not have to tokenize every chunk again.
+
+    The index is not thread-safe; DocumentCorpus serializes access.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._lengths = array("i")
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    @property
+    def terms(self) -> int:
+        return len(self._postings)
+
+    def add(self, term_counts: Sequence[Dict[str, int]]) -> None:
+        """Index consecutive chunks, given the term counts of each; chunk ids continue from len(self)"""
+        for counts in term_counts:
+            chunk_id = len(self._lengths)
+            length = sum(counts.values())
+            self._lengths.append(length)
+            self._total_length += length
+            for term, count in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("i"), array("i"))
+                postings[0].append(chunk_id)
+                postings[1].append(count)
+
+    def search(self, terms: Sequence[str], k: int) -> List[Tuple[int, float]]:
+        """Return up to `k` (chunk id, BM25 score) pairs, best first"""
+        n_chunks = len(self._lengths)
+        if not n_chunks:
+            return []
+        average_length = self._total_length / n_chunks or 1.0
+
+        chunk_parts, score_parts = [], []
+        for term in set(terms):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            chunk_ids = np.array(postings[0], dtype=np.int64)
+            frequency = np.array(postings[1], dtype=np.float64)
+            idf = math.log(1.0 + (n_chunks - len(chunk_ids) + 0.5) / (len(chunk_ids) + 0.5))
+            # Fancy indexing copies, so the view over the lengths array is released straight away
+            lengths = np.frombuffer(self._lengths, dtype=np.int32)[chunk_ids]
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths / average_length)
+            chunk_parts.append(chunk_ids)
+            score_parts.append(idf * frequency * (BM25_K1 + 1.0) / (frequency + norm))
+        if not chunk_parts:
+            return []
+
+        # Sum the per-term contributions of chunks that match several terms
+        chunk_ids, inverse = np.unique(np.concatenate(chunk_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(chunk_ids[i]), float(scores[i])) for i in top]
+
+    def save(self, path: str, key: str = "") -> None:
+        """Write the index to `path` as one .npz file, replacing it atomically; `key` must match on load"""
+        terms = list(self._postings)
+        sizes = np.fromiter((len(self._postings[term][0]) for term in terms), dtype=np.int64, count=len(terms))
+        arrays = {
+            "key": np.frombuffer(key.encode("utf-8"), dtype=np.uint8),
+            # Terms never contain a newline, since tokens are runs of word characters
+            "terms": np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+            "offsets": np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+            "chunk_ids": np.frombuffer(b"".join(self._postings[term][0].tobytes() for term in terms), dtype=np.int32),
+            "frequencies": np.frombuffer(b"".join(self._postings[term][1].tobytes() for term in terms), dtype=np.int32),
+            "lengths": np.frombuffer(self._lengths, dtype=np.int32),
+        }
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as handle:
+            np.savez(handle, **arrays)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str, key: str = "") -> Optional["InvertedIndex"]:
+        """Read an index written by `save`; None if there is none, or it was saved under another key"""
+        try:
+            with np.load(path) as data:
+                if data["key"].tobytes().decode("utf-8") != key:
+                    return None
+                terms = data["terms"].tobytes().decode("utf-8").split("\n") if len(data["terms"]) else []
+                offsets, chunk_ids = data["offsets"], data["chunk_ids"].tobytes()
+                frequencies, lengths = data["frequencies"].tobytes(), data["lengths"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        index = cls()
+        index._lengths.frombytes(lengths.tobytes())
+        index._total_length = int(lengths.sum())
+        for i, term in enumerate(terms):
+            start, end = int(offsets[i]) * 4, int(offsets[i + 1]) * 4
+            postings = index._postings[term] = (array("i"), array("i"))
+            postings[0].frombytes(chunk_ids[start:end])
+            postings[1].frombytes(frequencies[start:end])
+        return index
+
+    def truncate(self, count: int) -> None:
+        """Forget every chunk from `count` on"""
+        if count >= len(self._lengths):
+            return
+        self._total_length -= sum(self._lengths[count:])
+        del self._lengths[count:]
+        for term in list(self._postings):
+            chunk_ids, frequencies = self._postings[term]
+            # Chunk ids are appended in order, so the forgotten ones are at the end of each list
+            keep = len(chunk_ids)
+            while keep and chunk_ids[keep - 1] >= count:
+                keep -= 1
+            if not keep:
+                del self._postings[term]
+            elif keep < len(chunk_ids):
+                del chunk_ids[keep:]
+                del frequencies[keep:]
+
+
+class DocumentWriter:
+    """
+    Appends one document to a corpus a batch of chunks at a time; made by
+    DocumentCorpus.open_document for inputs too large to prepare at once.
+
+    Appended chunks are searchable straight away. The appended texts are
+    kept as a list and joined into the document's content once, by
+    `commit`, which also logs the document; `abort` removes its chunks
+    again. The corpus write lock is held from open to commit or abort, so
+    the document's chunks stay contiguous, which the vector file relies on.
+    """
+
+    def __init__(self, corpus: "DocumentCorpus", document: Dict):
+        self.corpus = corpus
+        self.document = document
+        self.first_chunk = len(corpus.chunks)
+        self.closed = False
+        self._fragments: List[str] = []
+        self._offsets: List[int] = []
+
+    def fragment(self, position: int) -> Tuple[str, int]:
+        """The appended text holding character `position` of the document, and that text's offset"""
+        i = bisect_right(self._offsets, position) - 1
+        return self._fragments[i], self._offsets[i]
+
+    def append(self, text: str, spans: List[Tuple[int, int]], term_counts: List[Dict[str, int]],
+               vectors: Optional[np.ndarray]) -> None:
+        """Append the next `text` of the document and its chunks; `spans` are offsets into `text`"""
+        corpus, document = self.corpus, self.document
+        with corpus._lock:
+            if self.closed:
+                raise ValueError("Document writer is closed")
+            offset = document["size"]
+            first_index = document["chunks"]
+            corpus.chunks.extend(
+                Chunk(document["document_id"], first_index + i, offset + start, offset + end)
+                for i, (start, end) in enumerate(spans)
+            )
+            corpus.index.add(term_counts)
+            if vectors is not None:
+                corpus.vectors.add(vectors)
+            self._fragments.append(text)
+            self._offsets.append(offset)
+            document["size"] = offset + len(text)
+            document["chunks"] += len(spans)
+
+    def commit(self) -> Dict:
+        """Log the finished document and release the corpus; returns its metadata record"""
+        corpus, document = self.corpus, self.document
+        with corpus._lock:
+            self.closed = True
+            document["content"] = "".join(self._fragments)
+            self._fragments, self._offsets = [], []
+            corpus._writer = None
+            committed = len(corpus.chunks)
+            try:
+                if corpus.directory:
+                    spans = [(chunk.start, chunk.end) for chunk in corpus.chunks[self.first_chunk:]]
+                    with open(corpus._documents_path(), "a", encoding="utf-8") as log:
+                        log.write(json.dumps({**document, "spans": spans}) + "\n")
+            finally:
+                corpus._write_lock.release()
+        # The ANN index only takes the document's vectors once it can no longer be rolled back. It may
+        # train or save here, so this runs outside the corpus lock and searches carry on meanwhile.
+        if corpus.ann is not None:
+            corpus.ann.add(committed)
+        return document
+
+    def abort(self) -> None:
+        """Remove the document's chunks and release the corpus"""
+        corpus = self.corpus
+        with corpus._lock:
+            if self.closed:
+                return
+            self.closed = True
+            corpus._writer = None
+            del corpus.chunks[self.first_chunk:]
+            corpus.index.truncate(self.first_chunk)
+            if corpus.vectors is not None:
+                corpus.vectors.truncate(self.first_chunk)
+            corpus.documents.pop(self.document["document_id"], None)
+            corpus._write_lock.release()
+
+
+class DocumentCorpus:
+    """
+    Documents split into sentence-aligned chunks of at most `chunk_size`
+    characters, each chunk indexed for BM25 retrieval and, with an
+    `embedder`, embedded into a vector store whose row i is chunk i.
+
+    Documents are chunked, tokenized and embedded outside the lock; only
+    merging the results into the indexes is serialized, so searches are
+    not held up for the whole time a large document is processed. Large
+    documents can also be added in batches through `open_document`.
+
+    With a `directory`, documents are appended to documents.jsonl (with
+    their chunk spans) and chunk vectors to vectors.f32 as they are added,
+    and the BM25 postings are saved to postings.npz by `load` and `close`.
+    `load` rebuilds the corpus from them: it still reads every logged
+    document, but only tokenizes chunks added since the postings were
+    saved and only embeds chunks whose vectors are missing.
+
+    With `ivf_lists`, dense search goes through an IVF index over the
+    vectors (see IVFIndex), built as chunks are added and saved in the
+    same directory. The index is trained and saved outside the lock, so
+    neither holds up searches.
+    """
+
+    def __init__(self, chunk_size: int, directory: Optional[str] = None, embedder: Optional[Embedder] = None,
+                 ivf_lists: Optional[int] = None, ivf_train_size: int = 50000, ivf_save_every: int = 10000):
+        self.chunk_size = chunk_size
+        self.directory = directory
+        self.embedder = embedder
+        self.documents: Dict[str, Dict] = {}
+        self.chunks: List[Chunk] = []
+        self.index = InvertedIndex()
+        self.vectors: Optional[VectorStore] = None
+        if embedder is not None:
+            # Vectors are only reusable for the same model and the same chunking
+            key = f"{embedder_key(embedder)}:{chunk_size}"
+            path = os.path.join(directory, "vectors.f32") if directory else None
+            self.vectors = VectorStore(embedder.dim, key, path)
+        self.ann: Optional[IVFIndex] = None
+        self.loaded = False
+        if self.vectors is not None and ivf_lists:
+            self.ann = IVFIndex(self.vectors, ivf_lists, ivf_train_size, directory, ivf_save_every)
+        self._lock = threading.Lock()
+        # Held by whoever is adding a document, so each document's chunks are contiguous
+        self._write_lock = threading.Lock()
+        # The batched document being added, whose content is still held by its writer
+        self._writer: Optional[DocumentWriter] = None
+
+    def _documents_path(self) -> str:
+        return os.path.join(self.directory, "documents.jsonl")
+
+    def _postings_path(self) -> str:
+        return os.path.join(self.directory, "postings.npz")
+
+    def _save_postings(self) -> None:
+        # Chunks of a document without logged spans are re-split on load, so the postings hold for one chunk size
+        self.index.save(self._postings_path(), f"chunk_size={self.chunk_size}")
+
+    def split_chunks(self, content: str) -> List[Tuple[int, int]]:
+        """Sentence-aligned spans of at most `chunk_size` characters"""
+        return [(start, end) for start, end, _ in iter_chunk_spans(content, self.chunk_size)]
+
+    def count_terms(self, content: str, spans: List[Tuple[int, int]], language: str) -> List[Dict[str, int]]:
+        """Term counts of each span"""
+        tokenize = get_language(language).tokenize
+        lowered = content.lower()
+        return [Counter(tokenize(lowered, start, end)) for start, end in spans]
+
+    def embed_chunks(self, content: str, spans: List[Tuple[int, int]], language: str) -> Optional[np.ndarray]:
+        """Embeddings of each span, or None without an embedder"""
+        if self.embedder is None or not spans:
+            return None
+        return self.embedder.embed([content[start:end] for start, end in spans], language)
+
+    def _commit(self, document: Dict, spans: List[Tuple[int, int]], term_counts: List[Dict[str, int]],
+                vectors: Optional[np.ndarray], persist: bool) -> None:
+        """Merge a prepared document into the indexes (and the log, when `persist`)"""
+        document_id = document["document_id"]
+        with self._write_lock, self._lock:
+            self.chunks.extend(Chunk(document_id, index, start, end) for index, (start, end) in enumerate(spans))
+            self.index.add(term_counts)
+            if vectors is not None:
+                self.vectors.add(vectors)
+            self.documents[document_id] = document
+            committed = len(self.chunks)
+            if persist and self.directory:
+                # Vectors are written first, so a logged document always has its vectors on disk
+                with open(self._documents_path(), "a", encoding="utf-8") as log:
+                    log.write(json.dumps({**document, "spans": spans}) + "\n")
+        # Outside the corpus lock, as in DocumentWriter.commit. While loading, the saved index is only
+        # mapped once every vector is back.
+        if self.ann is not None and vectors is not None and persist:
+            self.ann.add(committed)
+
+    def add_document(self, filename: str, content: str, language: Optional[str] = None) -> Dict:
+        """Chunk, tokenize, embed and index a document; returns its metadata record"""
+        language = language or detect_language(content)
+        spans = self.split_chunks(content)
+        term_counts = self.count_terms(content, spans, language)
+        vectors = self.embed_chunks(content, spans, language)
+        document = {
+            "document_id": uuid.uuid4().hex,
+            "filename": filename,
+            "content": content,
+            "language": language,
+            "upload_time": datetime.now().isoformat(),
+            "size": len(content),
+            "chunks": len(spans),
+        }
+        self._commit(document, spans, term_counts, vectors, persist=True)
+        return document
+
+    def open_document(self, filename: str, language: str) -> DocumentWriter:
+        """Start adding a document in batches; blocks while another document is being added"""
+        self._write_lock.acquire()
+        document = {
+            "document_id": uuid.uuid4().hex,
+            "filename": filename,
+            "content": "",
+            "language": language,
+            "upload_time": datetime.now().isoformat(),
+            "size": 0,
+            "chunks": 0,
+        }
+        with self._lock:
+            writer = self._writer = DocumentWriter(self, document)
+            self.documents[document["document_id"]] = document
+        return writer
+
+    def load(self) -> None:
+        """Rebuild the corpus from its directory; call once, in the process that serves it"""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if self.vectors is not None:
+            # Reopens the file after `close`; the rows read back are the ones already held
+            self.vectors.open()
+        if self.loaded:
+            return
+        self.loaded = True
+        saved_index = InvertedIndex.load(self._postings_path(), f"chunk_size={self.chunk_size}")
+        if saved_index is not None:
+            self.index = saved_index
+        # Chunks covered by the saved postings are not tokenized again
+        indexed = len(self.index)
+        if os.path.exists(self._documents_path()):
+            with open(self._documents_path(), encoding="utf-8") as log:
+                for line in log:
+                    try:
+                        document = json.loads(line)
+                    except ValueError:
+                        # A torn final line from an interrupted write
+                        continue
+                    content, language = document["content"], document["language"]
+                    # Documents logged before spans were recorded are split again
+                    spans = [tuple(span) for span in document.pop("spans", None) or self.split_chunks(content)]
+                    covered = max(0, min(len(spans), indexed - len(self.chunks)))
+                    term_counts = self.count_terms(content, spans[covered:], language)
+                    vectors = None
+                    if self.vectors is not None:
+                        saved = max(0, min(len(spans), len(self.vectors) - len(self.chunks)))
+                        vectors = self.embed_chunks(content, spans[saved:], language)
+                    self._commit(document, spans, term_counts, vectors, persist=False)
+        if self.vectors is not None:
+            # Drop vectors written for a document whose log line never made it
+            self.vectors.truncate(len(self.chunks))
+        # Likewise postings saved for chunks that are no longer logged
+        self.index.truncate(len(self.chunks))
+        if len(self.chunks) != indexed:
+            self._save_postings()
+        if self.ann is not None:
+            self.ann.load()
+
+    def close(self) -> None:
+        """Save the BM25 postings and the ANN index and close the vector file; call from the service's shutdown hook"""
+        if self.ann is not None:
+            self.ann.save()
+        with self._lock:
+            if self.directory and self.loaded:
+                self._save_postings()
+            if self.vectors is not None:
+                self.vectors.close()
+
+    def _passages(self, hits: List[Tuple[int, float]]) -> List[Passage]:
+        resolved = []
+        with self._lock:
+            for chunk_id, score in hits:
+                if chunk_id >= len(self.chunks):
+                    # Hits from a dense search can outlive chunks of an aborted document
+                    continue
+                chunk = self.chunks[chunk_id]
+                document = self.documents[chunk.document_id]
+                if self._writer is not None and self._writer.document is document:
+                    content, offset = self._writer.fragment(chunk.start)
+                else:
+                    content, offset = document["content"], 0
+                resolved.append((chunk_id, score, chunk, document, content, offset))
+        passages = []
+        for chunk_id, score, chunk, document, content, offset in resolved:
+            text = content[chunk.start - offset:chunk.end - offset]
+            passages.append(Passage(chunk_id, score, chunk.document_id, chunk.index, document["filename"], text))
+        return passages
+
+    def search(self, query: str, k: int, language: Optional[str] = None) -> List[Passage]:
+        """Return the `k` passages that best match `query` by BM25, best first"""
+        terms = get_language(language or detect_language(query)).tokenize(query.lower())
+        with self._lock:
+            hits = self.index.search(terms, k)
+        return self._passages(hits)
+
+    def search_vectors(self, query: str, k: int, language: Optional[str] = None,
+                       nprobe: Optional[int] = None) -> List[Passage]:
+        """
+        Return the `k` passages whose embeddings are closest to the query's, best first.
+
+        With an IVF index, `nprobe` buckets are scanned (default: a sixteenth of them).
+        """
+        if self.vectors is None:
+            raise ValueError("Dense retrieval requires an embedder")
+        query_vector = self.embedder.embed([query], language)
+        # Neither search needs the corpus lock, so dense queries never wait on BM25 queries or uploads
+        if self.ann is None:
+            hits = self.vectors.search(query_vector, k)[0]
+        else:
+            hits = self.ann.search(query_vector[0], k, nprobe or max(1, self.ann.nlist // 16))
+        return self._passages(hits)
+
+    def stats(self) -> Dict:
+        stats = {
+            "documents": len(self.documents),
+            "chunks": len(self.chunks),
+            "terms": self.index.terms,
+        }
+        if self.vectors is not None:
+            stats["vectors"] = self.vectors.stats()
+            stats["embedder"] = self.embedder.info()
+        if self.ann is not None:
+            stats["ann"] = self.ann.stats()
+        return stats
@@ -0,0 +1,113 @@
+"""
+Embeddings
+Text embedding backends for dense retrieval
+"""
+import os
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from language_support import detect_language, get_language
+
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "hashing").lower()
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "256"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+
+class Embedder(ABC):
+    """Base class for embedding backends; `embed` returns one unit-length float32 row per text"""
+
+    name = "base"
+    dim = 0
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str], language: Optional[str] = None) -> np.ndarray:
+        """Embed `texts`, tokenizing them for `language` (detected per text when None)"""
+
+    def info(self) -> Dict:
+        return {"provider": self.name, "dim": self.dim}
+
+
+class HashingEmbedder(Embedder):
+    """
+    Dependency-free embeddings from signed feature hashing of the text's terms.
+
+    Each non-stopword term adds a log-scaled count to one of `dim`
+    buckets with a hash-derived sign, so colliding terms cancel out on
+    average and the dot product of two texts tracks their term overlap.
+    Captures lexical rather than semantic similarity; use
+    sentence-transformers for that.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def embed(self, texts: Sequence[str], language: Optional[str] = None) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            terms, counts = np.unique(
+                get_language(language or detect_language(text)).tokenize(text.lower()), return_counts=True
+            )
+            if not len(terms):
+                continue
+            hashes = np.fromiter((zlib.crc32(term.encode("utf-8")) for term in terms), dtype=np.int64, count=len(terms))
+            signs = np.where(hashes & 1, 1.0, -1.0)
+            np.add.at(vectors[row], (hashes >> 1) % self.dim, signs * (1.0 + np.log(counts)))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """Semantic embeddings from a local sentence-transformers model"""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, batch_size: int = EMBEDDING_BATCH_SIZE):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ValueError("EMBEDDING_PROVIDER=sentence-transformers requires the sentence-transformers package") from e
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = SentenceTransformer(model_name)
+        self.dim = self._model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: Sequence[str], language: Optional[str] = None) -> np.ndarray:
+        vectors = self._model.encode(
+            list(texts), batch_size=self.batch_size, convert_to_numpy=True, normalize_embeddings=True
+        )
+        return vectors.astype(np.float32, copy=False)
+
+    def info(self) -> Dict:
+        return {"provider": self.name, "model": self.model_name, "dim": self.dim}
+
+
+_embedder: Optional[Embedder] = None
+
+
+def create_embedder(provider: str = EMBEDDING_PROVIDER) -> Embedder:
+    """Build the embedder for a provider"""
+    if provider == "hashing":
+        return HashingEmbedder()
+    if provider == "sentence-transformers":
+        return SentenceTransformerEmbedder()
+    raise ValueError(f"Unsupported EMBEDDING_PROVIDER: {provider}")
+
+
+def get_embedder() -> Embedder:
+    """Return the process-wide embedder, creating it on first use"""
+    global _embedder
+    if _embedder is None:
+        _embedder = create_embedder()
+    return _embedder
+
+
+def embedder_key(embedder: Embedder) -> str:
+    """Identify an embedder's vector space, so vectors from another model are never mixed in"""
+    return f"{embedder.info().get('model', embedder.name)}:{embedder.dim}"
+
@@ -0,0 +1,301 @@
+"""
+Extractive Summarizer Engine
+Vectorized TF-IDF centrality and TextRank sentence scoring
+"""
+import heapq
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from language_support import DEFAULT_LANGUAGE, get_language
+
+STRATEGIES = ("tfidf", "textrank")
+
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_MAX_ITERATIONS = 50
+TEXTRANK_TOLERANCE = 1e-6
+
+# Adjacent term pairs must recur this often to be reported as a keyphrase
+MIN_PHRASE_COUNT = 2
+
+
+class SentenceTermMatrix:
+    """Sparse sentence x term TF-IDF matrix in coordinate form"""
+
+    def __init__(self, rows: np.ndarray, cols: np.ndarray, weights: np.ndarray, shape: Tuple[int, int]):
+        self.rows = rows
+        self.cols = cols
+        self.weights = weights
+        self.shape = shape
+
+    def dot(self, vector: np.ndarray) -> np.ndarray:
+        """Compute X @ vector"""
+        return np.bincount(self.rows, weights=self.weights * vector[self.cols], minlength=self.shape[0])
+
+    def transpose_dot(self, vector: np.ndarray) -> np.ndarray:
+        """Compute X.T @ vector"""
+        return np.bincount(self.cols, weights=self.weights * vector[self.rows], minlength=self.shape[1])
+
+
+def tokenize_spans(text: str, spans: Sequence[Tuple[int, int]], language: str = DEFAULT_LANGUAGE,
+                   vocabulary: Optional[Dict[str, int]] = None) -> Tuple[np.ndarray, np.ndarray, Dict[str, int]]:
+    """
+    Tokenize each sentence span without slicing the text.
+
+    Returns parallel arrays of sentence index and term id for every
+    non-stopword token, plus the term vocabulary. New terms are added to
+    `vocabulary` when one is given, so ids stay stable across calls.
+    """
+    tokenize = get_language(language).tokenize
+    lowered = text.lower()
+    vocabulary = {} if vocabulary is None else vocabulary
+    row_ids: List[int] = []
+    term_ids: List[int] = []
+    for index, (start, end) in enumerate(spans):
+        ids = [vocabulary.setdefault(token, len(vocabulary)) for token in tokenize(lowered, start, end)]
+        term_ids.extend(ids)
+        row_ids.extend([index] * len(ids))
+    return np.asarray(row_ids, dtype=np.int64), np.asarray(term_ids, dtype=np.int64), vocabulary
+
+
+class TermStatistics:
+    """
+    The result of one tokenization pass over a text's sentences.
+
+    Holds the TF-IDF matrix used for sentence scoring alongside the token
+    stream and IDF values it was built from, so keywords and keyphrases
+    can be derived without tokenizing the text again.
+    """
+
+    def __init__(self, matrix: SentenceTermMatrix, row_ids: np.ndarray, term_ids: np.ndarray,
+                 terms: List[str], idf: np.ndarray, phrase_separator: str = " "):
+        self.matrix = matrix
+        self.row_ids = row_ids
+        self.term_ids = term_ids
+        self.terms = terms
+        self.idf = idf
+        self.phrase_separator = phrase_separator
+
+
+def build_term_statistics(text: str, spans: Sequence[Tuple[int, int]], language: str = DEFAULT_LANGUAGE,
+                          corpus=None) -> TermStatistics:
+    """
+    Tokenize the sentence spans once and build the TF-IDF matrix from the tokens.
+
+    `corpus` is an optional IDFStore; when it is active its document
+    frequencies replace the per-sentence ones of the text itself.
+    """
+    row_ids, term_ids, vocabulary = tokenize_spans(text, spans, language)
+    n_sentences, n_terms = len(spans), max(len(vocabulary), 1)
+    terms = list(vocabulary)
+
+    # Collapse repeated (sentence, term) pairs into counts
+    keys, counts = np.unique(row_ids * n_terms + term_ids, return_counts=True)
+    rows, cols = np.divmod(keys, n_terms)
+    idf = corpus.idf(terms) if corpus is not None and terms else None
+    if idf is None:
+        idf = sentence_idf(cols, n_sentences, n_terms)
+    matrix = weight_term_counts(rows, cols, counts, (n_sentences, n_terms), idf)
+    return TermStatistics(matrix, row_ids, term_ids, terms, idf, get_language(language).sentence_separator)
+
+
+def build_tfidf_matrix(text: str, spans: Sequence[Tuple[int, int]], language: str = DEFAULT_LANGUAGE,
+                       corpus=None) -> SentenceTermMatrix:
+    """Build an L2-normalized sentence x term TF-IDF matrix"""
+    return build_term_statistics(text, spans, language, corpus).matrix
+
+
+def sentence_idf(cols: np.ndarray, n_sentences: int, n_terms: int) -> np.ndarray:
+    """Smoothed IDF of each term, counting every sentence as a document"""
+    document_frequency = np.bincount(cols, minlength=n_terms)
+    return np.log((1.0 + n_sentences) / (1.0 + document_frequency)) + 1.0
+
+
+def weight_term_counts(rows: np.ndarray, cols: np.ndarray, counts: np.ndarray,
+                       shape: Tuple[int, int], idf: Optional[np.ndarray] = None) -> SentenceTermMatrix:
+    """
+    Turn distinct (sentence, term) counts into an L2-normalized TF-IDF matrix.
+
+    Without corpus `idf` values, each sentence counts as a document.
+    """
+    n_sentences, n_terms = shape
+    if idf is None:
+        idf = sentence_idf(cols, n_sentences, n_terms)
+    weights = (1.0 + np.log(counts)) * idf[cols]
+
+    norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n_sentences))
+    weights = weights / norms[rows]
+    return SentenceTermMatrix(rows, cols, weights, (n_sentences, n_terms))
+
+
+def term_weights(matrix: SentenceTermMatrix) -> np.ndarray:
+    """Total TF-IDF weight of each term across all sentences (the unnormalized document centroid)"""
+    return matrix.transpose_dot(np.ones(matrix.shape[0]))
+
+
+def document_term_weights(statistics: TermStatistics) -> np.ndarray:
+    """
+    TF-IDF of each term over the whole text: its total count times its IDF.
+
+    Unlike `term_weights`, sentence lengths do not matter, so a term
+    alone in a short sentence does not outrank one repeated throughout.
+    """
+    counts = np.bincount(statistics.term_ids, minlength=statistics.matrix.shape[1])
+    return counts * statistics.idf
+
+
+def tfidf_scores(matrix: SentenceTermMatrix) -> np.ndarray:
+    """Score sentences by cosine similarity to the document centroid"""
+    centroid = term_weights(matrix)
+    norm = np.linalg.norm(centroid)
+    if norm == 0:
+        return np.zeros(matrix.shape[0])
+    return matrix.dot(centroid / norm)
+
+
+def textrank_scores(matrix: SentenceTermMatrix) -> np.ndarray:
+    """
+    Score sentences with TextRank over the cosine similarity graph.
+
+    The graph W = X X^T (without self loops) is never materialized; each
+    power iteration applies it as two sparse matrix-vector products, so the
+    cost is linear in the number of tokens rather than quadratic in the
+    number of sentences.
+    """
+    n_sentences = matrix.shape[0]
+    # Rows are unit length, so the self-similarity on the diagonal is 1 for non-empty sentences
+    self_similarity = np.bincount(matrix.rows, weights=matrix.weights * matrix.weights, minlength=n_sentences)
+    degree = matrix.dot(matrix.transpose_dot(np.ones(n_sentences))) - self_similarity
+    connected = degree > 1e-12
+    inverse_degree = np.zeros(n_sentences)
+    inverse_degree[connected] = 1.0 / degree[connected]
+
+    scores = np.full(n_sentences, 1.0 / n_sentences)
+    for _ in range(TEXTRANK_MAX_ITERATIONS):
+        spread = scores * inverse_degree
+        neighbours = matrix.dot(matrix.transpose_dot(spread)) - self_similarity * spread
+        # Rank held by isolated sentences is redistributed uniformly
+        dangling = scores[~connected].sum() / n_sentences
+        updated = (1.0 - TEXTRANK_DAMPING) / n_sentences + TEXTRANK_DAMPING * (neighbours + dangling)
+        if np.abs(updated - scores).sum() < TEXTRANK_TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+
+def score_sentences(text: str, spans: Sequence[Tuple[int, int]], strategy: str = "tfidf",
+                    language: str = DEFAULT_LANGUAGE, corpus=None) -> np.ndarray:
+    """Return one relevance score per sentence span"""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown extractive strategy: {strategy}")
+    return score_matrix(build_tfidf_matrix(text, spans, language, corpus), strategy)
+
+
+def score_matrix(matrix: SentenceTermMatrix, strategy: str = "tfidf") -> np.ndarray:
+    """Score the sentences of a prebuilt TF-IDF matrix with the given strategy"""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown extractive strategy: {strategy}")
+    if strategy == "textrank":
+        return textrank_scores(matrix)
+    return tfidf_scores(matrix)
+
+
+def select_top_sentences(scores: Sequence[float], count: int, lengths: Optional[Sequence[int]] = None,
+                         max_chars: Optional[int] = None) -> List[int]:
+    """
+    Pick up to `count` of the highest scoring sentences, returned in document order.
+
+    Uses a heap rather than a full sort: O(n log count) without a budget.
+    With `max_chars`, sentences are popped in score order and kept while
+    their combined length (plus one separator each) fits the budget; if
+    not even the best sentence fits, it is returned alone for truncation.
+    """
+    scores = list(scores)
+    if max_chars is None:
+        return sorted(heapq.nlargest(count, range(len(scores)), key=scores.__getitem__))
+
+    heap = [(-score, index) for index, score in enumerate(scores)]
+    heapq.heapify(heap)
+    selected: List[int] = []
+    used = 0
+    while heap and len(selected) < count and used < max_chars:
+        _, index = heapq.heappop(heap)
+        needed = lengths[index] + (1 if selected else 0)
+        if used + needed <= max_chars:
+            selected.append(index)
+            used += needed
+    if not selected and scores:
+        selected.append(max(range(len(scores)), key=scores.__getitem__))
+    return sorted(selected)
+
+
+def select_sentences(text: str, spans: Sequence[Tuple[int, int]], strategy: str = "tfidf", count: int = 3,
+                     max_chars: Optional[int] = None, language: str = DEFAULT_LANGUAGE,
+                     scores: Optional[np.ndarray] = None, corpus=None) -> List[int]:
+    """
+    Pick the highest scoring sentences within the count and character budget, in document order.
+
+    Pass `scores` to reuse scores computed elsewhere instead of rescoring the text.
+    """
+    if len(spans) <= count and max_chars is None:
+        return list(range(len(spans)))
+    if scores is None:
+        scores = score_sentences(text, spans, strategy, language, corpus)
+    lengths = [end - start for start, end in spans]
+    return select_top_sentences(scores.tolist(), count, lengths, max_chars)
+
+
+def top_indices(scores: np.ndarray, count: int) -> np.ndarray:
+    """Indices of the `count` highest scores, best first"""
+    if count < len(scores):
+        candidates = np.argpartition(-scores, count - 1)[:count]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def extract_keywords(statistics: TermStatistics, count: int = 10) -> List[Tuple[str, float]]:
+    """Return the `count` terms with the highest document-level TF-IDF, best first"""
+    if not statistics.terms:
+        return []
+    weights = document_term_weights(statistics)
+    return [(statistics.terms[i], float(weights[i])) for i in top_indices(weights, count)]
+
+
+def extract_keyphrases(statistics: TermStatistics, count: int = 10) -> List[Tuple[str, float]]:
+    """
+    Return up to `count` two-term keyphrases, best first.
+
+    Candidates are pairs of terms that are adjacent in a sentence once
+    stopwords are dropped and that occur at least MIN_PHRASE_COUNT times.
+    A pair scores the combined weight of its terms, scaled by how often
+    the rarer term appears in the pair, so fixed collocations outrank
+    pairs of frequent terms that merely happen to meet.
+    """
+    row_ids, term_ids = statistics.row_ids, statistics.term_ids
+    if len(term_ids) < 2:
+        return []
+    n_terms = statistics.matrix.shape[1]
+    same_sentence = row_ids[1:] == row_ids[:-1]
+    firsts, seconds = term_ids[:-1][same_sentence], term_ids[1:][same_sentence]
+    pairs = firsts != seconds
+    keys, counts = np.unique(firsts[pairs] * n_terms + seconds[pairs], return_counts=True)
+    recurring = counts >= MIN_PHRASE_COUNT
+    if not recurring.any():
+        return []
+    keys, counts = keys[recurring], counts[recurring]
+    firsts, seconds = np.divmod(keys, n_terms)
+
+    weights = document_term_weights(statistics)
+    frequency = np.bincount(term_ids, minlength=n_terms)
+    scores = (weights[firsts] + weights[seconds]) * counts / np.minimum(frequency[firsts], frequency[seconds])
+
+    separator = statistics.phrase_separator
+    phrases = []
+    for i in top_indices(scores, count):
+        first, second = statistics.terms[firsts[i]], statistics.terms[seconds[i]]
+        if not separator and first[-1] == second[0]:
+            # Overlapping character bigrams of unsegmented text share a character
+            second = second[1:]
+        phrases.append((first + separator + second, float(scores[i])))
+    return phrases
@@ -0,0 +1,75 @@
+"""
+Flowise Stub Server
+Port: 3000
+
+Mimics Flowise's prediction API so the services can be exercised and
+benchmarked offline. Run with LLM_PROVIDER=flowise pointing at it.
+"""
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+import uvicorn
+import asyncio
+import os
+import uuid
+from itertools import islice
+from typing import Optional
+
+from sentence_segmenter import iter_sentence_spans, join_spans
+
+# Simulated model latency, to approximate a real provider under load
+STUB_LATENCY_MS = float(os.getenv("FLOWISE_STUB_LATENCY_MS", "0"))
+STUB_RESPONSE_SENTENCES = 3
+
+app = FastAPI(
+    title="Flowise Stub",
+    description="Offline stand-in for the Flowise prediction API",
+    version="1.0.0"
+)
+
+# Pydantic models
+class PredictionRequest(BaseModel):
+    question: str
+    chatId: Optional[str] = None
+    overrideConfig: Optional[dict] = None
+
+class PredictionResponse(BaseModel):
+    text: str
+    question: str
+    chatId: str
+    chatMessageId: str
+
+stats = {"predictions": 0}
+
+@app.get("/api/v1/ping")
+async def ping():
+    return "pong"
+
+@app.post("/api/v1/prediction/{chatflow_id}", response_model=PredictionResponse)
+async def prediction(chatflow_id: str, request: PredictionRequest):
+    """Return a deterministic completion built from the leading sentences of the prompt content"""
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+
+    if STUB_LATENCY_MS:
+        await asyncio.sleep(STUB_LATENCY_MS / 1000)
+
+    stats["predictions"] += 1
+    # Skip the instruction paragraph the services put ahead of the content
+    _, _, body = request.question.partition("\n\n")
+    body = body or request.question
+    spans = islice(iter_sentence_spans(body), STUB_RESPONSE_SENTENCES)
+    text = f"[{chatflow_id}] {join_spans(body, spans)}"
+
+    return PredictionResponse(
+        text=text,
+        question=request.question,
+        chatId=request.chatId or str(uuid.uuid4()),
+        chatMessageId=str(uuid.uuid4())
+    )
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "service": "flowise-stub", "predictions": stats["predictions"]}
+
+if __name__ == "__main__":
+    uvicorn.run("flowise_stub:app", host="0.0.0.0", port=3000, reload=True)
@@ -0,0 +1,147 @@
+"""
+IDF Store
+Persistent, memory-mapped corpus document frequencies for TF-IDF weighting
+"""
+import os
+import tempfile
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: lock the first byte of the file with msvcrt instead of flock
+    fcntl = None
+    import msvcrt
+
+_MAGIC = b"IDFSTOR1"
+# Header: magic, bucket count and document count as uint64, padded to 32 bytes
+_HEADER_WORDS = 4
+_HEADER_BYTES = _HEADER_WORDS * 8
+_BUCKETS, _DOCUMENTS = 1, 2
+
+
+def lock_file(fd: int) -> None:
+    """Take an exclusive advisory lock on an open file, waiting for other processes to release it"""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+
+def unlock_file(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def hash_terms(terms: Iterable[str], buckets: int) -> np.ndarray:
+    """Map terms to bucket indices with a stable hash, so every process agrees on the layout"""
+    hashes = np.fromiter((zlib.crc32(term.encode("utf-8")) for term in terms), dtype=np.uint64)
+    return (hashes % buckets).astype(np.int64)
+
+
+class IDFStore:
+    """
+    Document frequencies for a corpus, kept in a memory-mapped file.
+
+    Terms are hashed into a fixed number of buckets, each holding a
+    float32 document frequency, so the file size depends only on
+    `buckets` (4 bytes each) however many distinct terms are seen; rare
+    collisions merge the counts of unrelated terms. Counts are exact up to
+    2**24 documents per term.
+
+    Every process maps the same file with MAP_SHARED, so worker processes
+    share the page cache instead of each holding a copy, and updates from
+    any of them are visible to all. Updates take an advisory file lock
+    (flock, or msvcrt byte locking on Windows). The bucket count of an
+    existing file takes precedence over `buckets`.
+    """
+
+    def __init__(self, path: str, buckets: int, min_documents: int = 0):
+        self.path = path
+        self.min_documents = min_documents
+        if not os.path.exists(path):
+            self._create(path, buckets)
+
+        header = np.memmap(path, dtype=np.uint64, mode="r+", shape=(_HEADER_WORDS,))
+        if header[:1].tobytes() != _MAGIC:
+            raise ValueError(f"{path} is not an IDF store")
+        self.buckets = int(header[_BUCKETS])
+        self._header = header
+        self._table = np.memmap(path, dtype=np.float32, mode="r+", offset=_HEADER_BYTES, shape=(self.buckets,))
+        self._open_lock()
+
+    @staticmethod
+    def _create(path: str, buckets: int) -> None:
+        """Write an empty store next to `path` and link it into place, unless another process got there first"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(_MAGIC + np.array([buckets, 0, 0], dtype=np.uint64).tobytes())
+                # Extend without writing, leaving a sparse file of zero counts
+                handle.truncate(_HEADER_BYTES + buckets * 4)
+            try:
+                os.link(temp_path, path)
+            except FileExistsError:
+                pass
+        finally:
+            os.remove(temp_path)
+
+    def _open_lock(self) -> None:
+        """Open this process's own lock file description; flock does not exclude holders of a shared one"""
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._fd = os.open(self.path, os.O_RDWR)
+
+    @property
+    def documents(self) -> int:
+        return int(self._header[_DOCUMENTS])
+
+    def add_document(self, terms: Iterable[str]) -> None:
+        """Count one more document containing each of the given distinct terms"""
+        buckets = np.unique(hash_terms(terms, self.buckets))
+        if self._pid != os.getpid():
+            # Inherited across a fork from the parent process
+            self._open_lock()
+        with self._lock:
+            lock_file(self._fd)
+            try:
+                self._table[buckets] += 1
+                self._header[_DOCUMENTS] += 1
+            finally:
+                unlock_file(self._fd)
+
+    def idf(self, terms: List[str]) -> Optional[np.ndarray]:
+        """
+        Smoothed inverse document frequency of each term.
+
+        Returns None until the corpus holds `min_documents` documents, so
+        callers can fall back to frequencies from the text itself.
+        """
+        documents = self.documents
+        if documents < self.min_documents:
+            return None
+        frequency = self._table[hash_terms(terms, self.buckets)]
+        return np.log((1.0 + documents) / (1.0 + frequency)) + 1.0
+
+    def flush(self) -> None:
+        """Write dirty pages back to the file; call from the service's shutdown hook"""
+        self._table.flush()
+        self._header.flush()
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "buckets": self.buckets,
+            "documents": self.documents,
+            "active": self.documents >= self.min_documents,
+        }
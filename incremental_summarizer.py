@@ -0,0 +1,182 @@
+"""
+Incremental Summarizer
+Versioned documents whose segmentation and term counts are updated in place on edits
+"""
+import asyncio
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from extractive_summarizer import score_matrix, tokenize_spans, weight_term_counts
+from language_support import detect_language, get_language
+from sentence_segmenter import iter_sentence_spans
+
+# Block size for the first pass of the common prefix/suffix scans
+_COMPARE_BLOCK = 4096
+
+_NO_TERMS = np.zeros(0, dtype=np.int64)
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    """Length of the longest common prefix, compared block by block with slice equality"""
+    limit = min(len(a), len(b))
+    pos, block = 0, _COMPARE_BLOCK
+    while pos < limit:
+        end = min(pos + block, limit)
+        if a[pos:end] == b[pos:end]:
+            pos = end
+        elif end - pos == 1:
+            break
+        else:
+            block = (end - pos) // 2
+    return pos
+
+
+def common_suffix_length(a: str, b: str, limit: int) -> int:
+    """Length of the longest common suffix, at most `limit` characters"""
+    len_a, len_b = len(a), len(b)
+    pos, block = 0, _COMPARE_BLOCK
+    while pos < limit:
+        end = min(pos + block, limit)
+        if a[len_a - end:len_a - pos] == b[len_b - end:len_b - pos]:
+            pos = end
+        elif end - pos == 1:
+            break
+        else:
+            block = (end - pos) // 2
+    return pos
+
+
+class IncrementalDocument:
+    """
+    A tracked document and the per-sentence data derived from it.
+
+    On each new version only the sentences around the edited region are
+    re-segmented and re-tokenized; spans and term counts outside it are
+    reused (spans after the edit are shifted). Scoring then runs on the
+    cached counts, which is vectorized and cheap next to tokenization.
+    """
+
+    def __init__(self, document_id: str, language: Optional[str] = None):
+        self.document_id = document_id
+        self.language = language
+        self.version = 0
+        self.text = ""
+        self.spans: List[Tuple[int, int]] = []
+        self.lock = asyncio.Lock()
+        self.last_reused = 0
+        self.last_rescanned = 0
+        self._terms: List[np.ndarray] = []
+        self._counts: List[np.ndarray] = []
+        self._vocabulary: Dict[str, int] = {}
+        self._scores: Dict[str, np.ndarray] = {}
+
+    def update(self, text: str) -> None:
+        """Move the document to a new version of its text"""
+        if self.language is None:
+            self.language = detect_language(text)
+        if not self.spans:
+            window_start, first, last = 0, 0, -1
+            old_window_end = len(self.text)
+        else:
+            window_start, old_window_end, first, last = self._edit_window(text)
+
+        delta = len(text) - len(self.text)
+        window = text[window_start:old_window_end + delta]
+        window_spans = list(iter_sentence_spans(window, abbreviations=get_language(self.language).abbreviations))
+        terms, counts = self._count_terms(window, window_spans)
+
+        tail = last + 1
+        self.spans = (
+            self.spans[:first]
+            + [(start + window_start, end + window_start) for start, end in window_spans]
+            + [(start + delta, end + delta) for start, end in self.spans[tail:]]
+        )
+        self._terms = self._terms[:first] + terms + self._terms[tail:]
+        self._counts = self._counts[:first] + counts + self._counts[tail:]
+        self.last_rescanned = len(window_spans)
+        self.last_reused = len(self.spans) - len(window_spans)
+        self.text = text
+        self.version += 1
+        self._scores = {}
+
+    def _edit_window(self, text: str) -> Tuple[int, int, int, int]:
+        """
+        Locate the old sentences an edit can affect.
+
+        Returns the window start, the window end in the old text, and the
+        first and last old sentence indices to replace. One unchanged
+        sentence is kept on each side of the edit, since a boundary
+        decision looks at the neighbouring sentence.
+        """
+        old = self.text
+        prefix = common_prefix_length(old, text)
+        suffix = common_suffix_length(old, text, min(len(old), len(text)) - prefix)
+        changed_end = len(old) - suffix
+
+        first = max(0, bisect_left([end for _, end in self.spans], prefix) - 1)
+        last = min(len(self.spans) - 1, bisect_right([start for start, _ in self.spans], changed_end))
+        window_start = self.spans[first][0] if first else 0
+        old_window_end = self.spans[last][1] if last < len(self.spans) - 1 else len(old)
+        return window_start, old_window_end, first, last
+
+    def _count_terms(self, window: str, spans: List[Tuple[int, int]]) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """Distinct term ids and their counts for each sentence in the window"""
+        if not spans:
+            return [], []
+        row_ids, term_ids, _ = tokenize_spans(window, spans, self.language, self._vocabulary)
+        n_terms = max(len(self._vocabulary), 1)
+        keys, counts = np.unique(row_ids * n_terms + term_ids, return_counts=True)
+        rows, cols = np.divmod(keys, n_terms)
+        bounds = np.searchsorted(rows, np.arange(len(spans) + 1))
+        return (
+            [cols[bounds[i]:bounds[i + 1]] for i in range(len(spans))],
+            [counts[bounds[i]:bounds[i + 1]] for i in range(len(spans))],
+        )
+
+    def scores(self, strategy: str, corpus=None) -> np.ndarray:
+        """
+        Sentence scores for the current version, computed from the cached term counts.
+
+        With an active IDFStore as `corpus`, its document frequencies are used.
+        """
+        scores = self._scores.get(strategy)
+        if scores is None:
+            idf = corpus.idf(list(self._vocabulary)) if corpus is not None and self._vocabulary else None
+            n_sentences = len(self.spans)
+            lengths = np.fromiter((len(terms) for terms in self._terms), dtype=np.int64, count=n_sentences)
+            rows = np.repeat(np.arange(n_sentences), lengths)
+            cols = np.concatenate(self._terms) if n_sentences else _NO_TERMS
+            counts = np.concatenate(self._counts) if n_sentences else _NO_TERMS
+            matrix = weight_term_counts(rows, cols, counts, (n_sentences, max(len(self._vocabulary), 1)), idf)
+            scores = self._scores[strategy] = score_matrix(matrix, strategy)
+        return scores
+
+
+class DocumentStore:
+    """LRU-bounded registry of tracked documents, keyed by client-supplied id"""
+
+    def __init__(self, max_documents: int):
+        self.max_documents = max_documents
+        self._documents: "OrderedDict[str, IncrementalDocument]" = OrderedDict()
+        self.evictions = 0
+
+    def get(self, document_id: str, language: Optional[str] = None) -> IncrementalDocument:
+        """Return the tracked document, starting a new one if it is unknown or its language changed"""
+        document = self._documents.get(document_id)
+        if document is None or (language is not None and language != document.language):
+            document = self._documents[document_id] = IncrementalDocument(document_id, language)
+        self._documents.move_to_end(document_id)
+        while len(self._documents) > self.max_documents:
+            self._documents.popitem(last=False)
+            self.evictions += 1
+        return document
+
+    def stats(self) -> Dict:
+        return {
+            "documents": len(self._documents),
+            "max_documents": self.max_documents,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,145 @@
+"""
+Ingestion
+Streaming document ingestion into a DocumentCorpus: extract, chunk, embed and index as overlapping stages
+"""
+import asyncio
+import os
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from document_index import DocumentCorpus, DocumentWriter
+from language_support import detect_language
+
+# Batches waiting between two stages; bounds the memory of a document in flight
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+# Chunks per batch handed from one stage to the next
+INGEST_BATCH_CHUNKS = int(os.getenv("INGEST_BATCH_CHUNKS", "64"))
+
+# Marks the end of a stage's output
+_DONE = object()
+
+Batch = Tuple[str, List[Tuple[int, int]], List[Dict[str, int]]]
+
+
+class EmptyDocumentError(ValueError):
+    """Raised when a document yields no indexable text"""
+
+
+def cut_batches(corpus: DocumentCorpus, text: str, language: str, final: bool,
+                batch_chunks: int = INGEST_BATCH_CHUNKS) -> Tuple[int, List[Batch]]:
+    """
+    Cut the complete chunks off the front of buffered text and count their terms.
+
+    Returns how many characters were consumed and batches of (text,
+    spans within that text, term counts) covering them in order. Unless
+    `final`, the last chunk is held back: the sentences still to come may
+    belong to it, so it is cut again once more text has arrived.
+    """
+    spans = corpus.split_chunks(text)
+    if final:
+        consumed = len(text)
+    elif len(spans) > 1:
+        consumed, spans = spans[-1][0], spans[:-1]
+    else:
+        return 0, []
+
+    batches = []
+    start = 0
+    for first in range(0, len(spans), batch_chunks):
+        group = spans[first:first + batch_chunks]
+        end = spans[first + batch_chunks][0] if first + batch_chunks < len(spans) else consumed
+        relative = [(span_start - start, span_end - start) for span_start, span_end in group]
+        fragment = text[start:end]
+        batches.append((fragment, relative, corpus.count_terms(fragment, relative, language)))
+        start = end
+    if start < consumed:
+        # Text after the last chunk (trailing whitespace, or a document with no sentences)
+        batches.append((text[start:consumed], [], []))
+    return consumed, batches
+
+
+async def ingest_document(corpus: DocumentCorpus, pieces: AsyncIterator[str], filename: str,
+                          language: Optional[str] = None, queue_size: int = INGEST_QUEUE_SIZE) -> Dict:
+    """
+    Stream a document's text into the corpus and return its metadata record.
+
+    Four stages run concurrently, joined by bounded queues: extraction
+    (reading `pieces`), chunking and term counting, embedding, and
+    indexing. CPU-bound work runs in the default executor, so extracting
+    the next pages overlaps with embedding and indexing earlier ones, and
+    a full queue pauses the stages before it. Only the chunk being
+    assembled and a few batches per queue are held besides the corpus
+    itself. The document's chunks become searchable as they are indexed;
+    if any stage fails they are removed again.
+    """
+    loop = asyncio.get_running_loop()
+    texts: asyncio.Queue = asyncio.Queue(queue_size)
+    chunked: asyncio.Queue = asyncio.Queue(queue_size)
+    embedded: asyncio.Queue = asyncio.Queue(queue_size)
+    writer: Optional[DocumentWriter] = None
+
+    async def extract() -> None:
+        async for piece in pieces:
+            await texts.put(piece)
+        await texts.put(_DONE)
+
+    async def chunk() -> None:
+        nonlocal language
+        buffer = ""
+        while True:
+            piece = await texts.get()
+            final = piece is _DONE
+            if not final:
+                buffer += piece
+                if len(buffer) <= corpus.chunk_size:
+                    continue
+            if language is None:
+                language = detect_language(buffer)
+            consumed, batches = await loop.run_in_executor(None, cut_batches, corpus, buffer, language, final)
+            buffer = buffer[consumed:]
+            for batch in batches:
+                await chunked.put(batch)
+            if final:
+                await chunked.put(_DONE)
+                return
+
+    async def embed() -> None:
+        while True:
+            batch = await chunked.get()
+            if batch is _DONE:
+                await embedded.put(_DONE)
+                return
+            text, spans, term_counts = batch
+            vectors = await loop.run_in_executor(None, corpus.embed_chunks, text, spans, language)
+            await embedded.put((text, spans, term_counts, vectors))
+
+    async def index() -> None:
+        nonlocal writer
+        while True:
+            batch = await embedded.get()
+            if batch is _DONE:
+                return
+            if writer is None:
+                # Waits for any other document being added, so it runs off the event loop
+                opening = loop.run_in_executor(None, corpus.open_document, filename, language)
+                try:
+                    writer = await asyncio.shield(opening)
+                except asyncio.CancelledError:
+                    # The writer still opens and holds the corpus; release it as soon as it does
+                    opening.add_done_callback(lambda done: done.exception() or done.result().abort())
+                    raise
+            await loop.run_in_executor(None, writer.append, *batch)
+
+    stages = [asyncio.ensure_future(stage()) for stage in (extract, chunk, embed, index)]
+    try:
+        await asyncio.gather(*stages)
+        if writer is None or not writer.document["chunks"]:
+            raise EmptyDocumentError("Document contains no text")
+    except BaseException:
+        for stage in stages:
+            stage.cancel()
+        await asyncio.gather(*stages, return_exceptions=True)
+        if writer is not None:
+            # An append still running in a thread finds the writer closed and adds nothing
+            await asyncio.shield(loop.run_in_executor(None, writer.abort))
+        raise
+    return await loop.run_in_executor(None, writer.commit)
@@ -0,0 +1,226 @@
+"""
+Job Queue
+Bounded background job runner for long-running requests
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class Job:
+    """State of one submitted job"""
+
+    def __init__(self, compute: Optional[Callable[[], Awaitable[Any]]], job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.status = "queued"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._compute = compute
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name != "posix":
+        # Signal 0 only probes on POSIX; elsewhere os.kill terminates the process
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobQueue:
+    """
+    Run submitted coroutines on a fixed number of worker tasks.
+
+    At most `max_queued` jobs wait for a worker; submitting beyond that
+    raises JobQueueFull so callers can shed load. Finished jobs are kept
+    for `result_ttl` seconds so their results can be collected, then
+    dropped. Workers start on the first submission.
+
+    With a `state_dir`, each job's status and result (which must then be
+    bytes or None) are also written to a file there, so `get` finds jobs
+    submitted in other processes sharing the directory, such as the
+    workers of serve.py. Jobs still run in the process that accepted
+    them; one whose process died is reported as failed.
+    """
+
+    def __init__(self, workers: int, max_queued: int, result_ttl: float,
+                 describe_error: Callable[[Exception], str] = str, state_dir: Optional[str] = None):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.state_dir = state_dir or None
+        self._describe_error = describe_error
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: Dict[str, Job] = {}
+        self._finished: Deque[Tuple[float, str]] = deque()
+        self.running = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def submit(self, compute: Callable[[], Awaitable[Any]]) -> Job:
+        self._prune()
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+            self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+            self._sweep_state()
+
+        job = Job(compute)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise JobQueueFull(f"Job queue is full ({self.max_queued} jobs waiting)")
+        self._jobs[job.id] = job
+        self.submitted += 1
+        self._save_state(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._prune()
+        job = self._jobs.get(job_id)
+        if job is None and self.state_dir:
+            job = self._load_state(job_id)
+        return job
+
+    def _state_path(self, job_id: str) -> str:
+        return os.path.join(self.state_dir, f"{job_id}.job")
+
+    def _save_state(self, job: Job) -> None:
+        """Write the job's status, then its result bytes, for the other processes sharing `state_dir`"""
+        if not self.state_dir:
+            return
+        header = {
+            "status": job.status,
+            "error": job.error,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+            "pid": os.getpid(),
+        }
+        path = self._state_path(job.id)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            with open(temp_path, "wb") as handle:
+                handle.write(json.dumps(header).encode("utf-8") + b"\n")
+                if job.result is not None:
+                    handle.write(job.result)
+            os.replace(temp_path, path)
+        except OSError:
+            # The job still runs and is visible to this process; only other processes miss the update
+            pass
+
+    def _load_state(self, job_id: str) -> Optional[Job]:
+        """A job submitted in another process, as of its last saved state"""
+        # Ids are hex, so a crafted id cannot name a file outside the directory
+        if not job_id.isalnum():
+            return None
+        path = self._state_path(job_id)
+        try:
+            with open(path, "rb") as handle:
+                header = json.loads(handle.readline())
+                result = handle.read()
+        except (OSError, ValueError):
+            return None
+
+        job = Job(None, job_id)
+        job.status, job.error = header["status"], header["error"]
+        job.created_at, job.started_at = header["created_at"], header["started_at"]
+        job.finished_at = header["finished_at"]
+        job.result = result if job.status == "succeeded" else None
+        if job.finished_at is not None and job.finished_at + self.result_ttl <= time.time():
+            self._remove_state(job_id)
+            return None
+        if job.finished_at is None and not _process_alive(header["pid"]):
+            job.status, job.error = "failed", "The worker running this job exited before it finished"
+        return job
+
+    def _remove_state(self, job_id: str) -> None:
+        try:
+            os.remove(self._state_path(job_id))
+        except OSError:
+            pass
+
+    def _sweep_state(self) -> None:
+        """Remove state files untouched for `result_ttl`, such as those left by a worker that died"""
+        if not self.state_dir or not os.path.isdir(self.state_dir):
+            return
+        expired = time.time() - self.result_ttl
+        for name in os.listdir(self.state_dir):
+            path = os.path.join(self.state_dir, name)
+            try:
+                # A job still waiting this long loses its file until it next changes state
+                if os.path.getmtime(path) < expired:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            self.running += 1
+            self._save_state(job)
+            try:
+                job.result = await job._compute()
+                job.status = "succeeded"
+                self.succeeded += 1
+            except Exception as e:
+                job.error = self._describe_error(e)
+                job.status = "failed"
+                self.failed += 1
+            finally:
+                self.running -= 1
+                job._compute = None
+                job.finished_at = time.time()
+                self._finished.append((job.finished_at + self.result_ttl, job.id))
+                self._save_state(job)
+                self._queue.task_done()
+
+    def _prune(self) -> None:
+        """Drop finished jobs whose results have expired"""
+        now = time.time()
+        while self._finished and self._finished[0][0] <= now:
+            _, job_id = self._finished.popleft()
+            self._jobs.pop(job_id, None)
+            if self.state_dir:
+                self._remove_state(job_id)
+
+    async def close(self) -> None:
+        """Cancel the workers; call from the service's shutdown hook"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queued": self.max_queued,
+            "running": self.running,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
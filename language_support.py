@@ -0,0 +1,191 @@
+"""
+Language Support
+Language detection and lazily loaded per-language tokenizers and stopword lists
+"""
+import os
+import re
+import threading
+from typing import Dict, FrozenSet, List, NamedTuple, Optional
+
+from sentence_segmenter import ABBREVIATIONS
+
+DEFAULT_LANGUAGE = os.getenv("DEFAULT_LANGUAGE", "en")
+
+# Only the head of a text is inspected when detecting its language
+DETECTION_SAMPLE_CHARS = 2000
+
+_WORD = re.compile(r"[^\W\d_]{2,}")
+_CJK_RUN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff]+")
+_CJK_OR_WORD = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff]+|[^\W\d_]{2,}")
+_KANA = re.compile(r"[\u3040-\u30ff]")
+_HAN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff]")
+_CYRILLIC = re.compile(r"[\u0400-\u04ff]")
+
+
+class LanguageSpec(NamedTuple):
+    """Raw resource data for one language, parsed on first use"""
+    name: str
+    stopwords: str
+    abbreviations: str = ""
+    # Written without spaces between words; tokenized into character bigrams
+    unsegmented: bool = False
+
+
+_LANGUAGE_SPECS: Dict[str, LanguageSpec] = {
+    "en": LanguageSpec("English", """
+        a about above after again against all also am an and any are as at be because been
+        before being below between both but by can could did do does doing down during each
+        few for from further had has have having he her here hers herself him himself his how
+        i if in into is it its itself just me more most my myself no nor not now of off on once
+        only or other our ours ourselves out over own same she should so some such than that the
+        their theirs them themselves then there these they this those through to too under until
+        up very was we were what when where which while who whom why will with would you your
+        yours yourself yourselves
+    """, " ".join(sorted(ABBREVIATIONS))),
+    "de": LanguageSpec("German", """
+        aber alle allem allen aller als also am an auch auf aus bei bin bis bist da damit dann
+        das dass dem den der des die dies diese diesem diesen dieser dieses doch dort du durch
+        ein eine einem einen einer eines er es etwa für hat hatte hier ich ihr ihre im in ist
+        ja jede jedem jeden jeder jedes kann kein keine man mehr mein mich mit muss nach nicht
+        noch nun nur ob oder ohne schon sehr sein seine sich sie sind so über um und uns unter
+        vom von vor war waren was weil wenn wer wie wir wird wo zu zum zur
+    """, "z.b bzw usw ca dr prof nr str vgl evtl ggf d.h u.a z.t"),
+    "es": LanguageSpec("Spanish", """
+        al algo algunas algunos ante antes como con contra cual cuando de del desde donde
+        durante el ella ellas ellos en entre era es esa esas ese eso esos esta estaba estas
+        este esto estos fue fueron ha hay la las le les lo los más me mi muy nada ni no nos
+        otra otro para pero por porque que qué se sea ser si sí sin sobre su sus también tanto
+        te tiene todo todos tu un una uno unos ya yo
+    """, "sr sra srta dr dra ud uds etc p.ej pág núm"),
+    "fr": LanguageSpec("French", """
+        ainsi au aussi aux avec ce ces cette comme dans de des donc du elle elles en est et été
+        être il ils je la le les leur leurs lui mais me même mes moi mon ne nos notre nous on
+        ou où par pas pour qu que qui sa sans se ses son sont sur ta te tes toi ton tous tout
+        très tu un une vos votre vous
+    """, "m mme mlle dr etc p.ex cf av bd"),
+    "it": LanguageSpec("Italian", """
+        ad al alla alle anche come con da dal dalla dei del della delle di ed essere gli ha
+        hanno il in io la le lei lo loro lui ma mi molto nei nel nella non noi per più quella
+        quello questa questo se si sono su sua suo tra tu un una uno voi
+    """, "sig dott prof ecc pag dr"),
+    "pt": LanguageSpec("Portuguese", """
+        ao aos as até com como da das de dela dele do dos ela elas ele eles em entre era essa
+        esse esta este eu foi for há isso isto já lhe mais mas me mesmo meu minha muito na nas
+        não nem no nos os ou para pela pelo por qual quando que se sem ser seu sua são também
+        te tem um uma uns você
+    """, "sr sra dr dra etc pág p.ex"),
+    "nl": LanguageSpec("Dutch", """
+        aan al als bij dan dat de der deze die dit door een en er had heb hebben heeft hem het
+        hij hoe hun ik in is je kan me men met mij na naar niet nog nu of om omdat ons ook op
+        over te tot uit van veel voor was wat we wel werd wie wij wordt zal ze zich zij zijn zo
+        zonder
+    """, "dhr mevr dr bijv enz o.a d.w.z ca nr"),
+    "ru": LanguageSpec("Russian", """
+        без более бы был была были было быть вам вас весь во вот все всего всех вы где да даже
+        для до его ее если есть еще же за здесь из или им их как когда кто ли либо между меня
+        мне может мы на над надо наш не него нее нет ни них но ну об однако он она они оно от
+        очень по под после при со так также такой там те тем то того тоже только том ты уже
+        хотя чего чем что чтобы это эта эти
+    """, "т.е т.д т.п г гг др им см стр"),
+    # Function characters; runs of text are split on them before bigramming
+    "zh": LanguageSpec("Chinese", """
+        的 了 是 在 和 与 及 或 也 都 就 而 并 但 又 把 被 让 给 对 从 向 以 之 其 这 那 我 你 他 她 它 们
+        个 着 过 吗 呢 吧 啊
+    """, unsegmented=True),
+    "ja": LanguageSpec("Japanese", """
+        の に は を が で と も へ や か な ね よ た だ て し
+    """, unsegmented=True),
+}
+
+SUPPORTED_LANGUAGES = tuple(_LANGUAGE_SPECS)
+
+# Languages told apart by stopword overlap rather than by script
+_WORD_LANGUAGES = ("en", "de", "es", "fr", "it", "pt", "nl")
+
+
+class LanguageResources:
+    """Tokenizer, stopwords and abbreviations for one language"""
+
+    def __init__(self, code: str, spec: LanguageSpec):
+        self.code = code
+        self.name = spec.name
+        self.stopwords: FrozenSet[str] = frozenset(spec.stopwords.split())
+        self.abbreviations: FrozenSet[str] = frozenset(spec.abbreviations.split())
+        self.unsegmented = spec.unsegmented
+        self.sentence_separator = "" if self.unsegmented else " "
+        if self.unsegmented:
+            self._split = re.compile("[" + re.escape("".join(sorted(self.stopwords))) + "]+")
+
+    def tokenize(self, lowered: str, start: int = 0, end: Optional[int] = None) -> List[str]:
+        """
+        Return the non-stopword tokens of lowered[start:end].
+
+        Languages written without spaces are split on their function
+        characters and each remaining run contributes its character bigrams.
+        """
+        end = len(lowered) if end is None else end
+        if not self.unsegmented:
+            return [token for token in _WORD.findall(lowered, start, end) if token not in self.stopwords]
+
+        tokens: List[str] = []
+        for match in _CJK_OR_WORD.finditer(lowered, start, end):
+            token = match.group()
+            if not _CJK_RUN.fullmatch(token):
+                tokens.append(token)
+                continue
+            for run in self._split.split(token):
+                if len(run) == 1:
+                    tokens.append(run)
+                else:
+                    tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        return tokens
+
+
+_registry: Dict[str, LanguageResources] = {}
+_registry_lock = threading.Lock()
+
+
+def get_language(code: str) -> LanguageResources:
+    """Return the resources for a language, loading them into the process-wide registry on first use"""
+    resources = _registry.get(code)
+    if resources is None:
+        if code not in _LANGUAGE_SPECS:
+            raise ValueError(f"Unsupported language: {code}")
+        with _registry_lock:
+            resources = _registry.get(code)
+            if resources is None:
+                resources = _registry[code] = LanguageResources(code, _LANGUAGE_SPECS[code])
+    return resources
+
+
+def loaded_languages() -> List[str]:
+    return sorted(_registry)
+
+
+def detect_language(text: str, default: str = DEFAULT_LANGUAGE) -> str:
+    """
+    Guess the language of `text` from a sample of its head.
+
+    Scripts with a single supported language (Japanese kana, Han, Cyrillic)
+    decide directly; Latin-script text goes to the language whose
+    stopwords occur most often, or to `default` when none occur.
+    """
+    sample = text[:DETECTION_SAMPLE_CHARS]
+    letters = sum(1 for char in sample if char.isalpha())
+    if not letters:
+        return default
+    if len(_KANA.findall(sample)) > letters * 0.05:
+        return "ja"
+    if len(_HAN.findall(sample)) > letters * 0.3:
+        return "zh"
+    if len(_CYRILLIC.findall(sample)) > letters * 0.3:
+        return "ru"
+
+    words = _WORD.findall(sample.lower())
+    best, best_hits = default, 0
+    for code in _WORD_LANGUAGES:
+        stopwords = get_language(code).stopwords
+        hits = sum(1 for word in words if word in stopwords)
+        if hits > best_hits:
+            best, best_hits = code, hits
+    return best
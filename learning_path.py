@@ -9,6 +9,8 @@ import uvicorn
 from typing import Optional, List, Dict
 import json
 
+from llm_client import LLMBackendError, backend_info, close_backend, get_backend
+
 app = FastAPI(
     title="Learning Path Suggestion Service",
     description="AI-powered personalized learning path recommendations",
@@ -47,6 +49,12 @@ class LearningPathResponse(BaseModel):
     total_duration: Optional[str] = None
     difficulty: Optional[str] = None
 
+LEARNING_PATH_PROMPT = (
+    "Write a short, motivating overview of a personalized learning path for a "
+    "{experience_level} learner with {time_commitment} available. Goals: {goals}\n\n"
+    "The path has these phases:\n{phases}"
+)
+
 def generate_learning_path(goals: str, experience_level: str = "beginner", time_commitment: str = "3-5 hours/week") -> Dict:
     """Generate a comprehensive learning path based on user input"""
     
@@ -219,6 +227,21 @@ Key Skills: {', '.join(phase.skills_gained)}
         "focus_areas": focus_areas
     }
 
+async def describe_learning_path(path_data: Dict, goals: str, experience_level: str, time_commitment: str) -> str:
+    """Return the learning path narrative, written by the LLM backend when one is configured"""
+    backend = get_backend()
+    if backend is None:
+        return path_data["learning_path"]
+    
+    phases = "\n".join(f"- {phase.title} ({phase.duration}): {phase.description}" for phase in path_data["phases"])
+    prompt = LEARNING_PATH_PROMPT.format(
+        experience_level=experience_level,
+        time_commitment=time_commitment,
+        goals=goals,
+        phases=phases
+    )
+    return await backend.complete(prompt, "learning_path")
+
 @app.get("/")
 async def root():
     return {
@@ -230,7 +253,11 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "learning-path"}
+    return {"status": "healthy", "service": "learning-path", "llm": backend_info()}
+
+@app.on_event("shutdown")
+async def shutdown_backend():
+    await close_backend()
 
 @app.post("/suggest-path", response_model=LearningPathResponse)
 async def suggest_learning_path(request: LearningPathRequest):
@@ -245,9 +272,10 @@ async def suggest_learning_path(request: LearningPathRequest):
             experience_level="beginner",
             time_commitment="3-5 hours/week"
         )
+        learning_path = await describe_learning_path(path_data, request.text, "beginner", "3-5 hours/week")
         
         return LearningPathResponse(
-            learning_path=path_data["learning_path"],
+            learning_path=learning_path,
             phases=path_data["phases"],
             total_duration=path_data["total_duration"],
             difficulty=path_data["difficulty"]
@@ -255,6 +283,8 @@ async def suggest_learning_path(request: LearningPathRequest):
     
     except HTTPException:
         raise
+    except LLMBackendError as e:
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating learning path: {str(e)}")
 
@@ -271,9 +301,12 @@ async def suggest_learning_path_json(request: LearningPathJSONRequest):
             experience_level=request.experience_level,
             time_commitment=request.time_commitment
         )
+        learning_path = await describe_learning_path(
+            path_data, request.goals, request.experience_level, request.time_commitment
+        )
         
         return LearningPathResponse(
-            learning_path=path_data["learning_path"],
+            learning_path=learning_path,
             phases=path_data["phases"],
             total_duration=path_data["total_duration"],
             difficulty=path_data["difficulty"]
@@ -281,6 +314,8 @@ async def suggest_learning_path_json(request: LearningPathJSONRequest):
     
     except HTTPException:
         raise
+    except LLMBackendError as e:
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating learning path: {str(e)}")
 
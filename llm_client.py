@@ -0,0 +1,164 @@
+"""
+LLM Backend Client
+Shared, connection-pooled client for the configured LLM provider
+"""
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+import httpx
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "mock").lower()
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_API_KEY = os.getenv("LLM_API_KEY", "")
+LLM_API_URL = os.getenv("LLM_API_URL", "")
+FLOWISE_API_URL = os.getenv("FLOWISE_API_URL", "http://localhost:3000")
+FLOWISE_API_KEY = os.getenv("FLOWISE_API_KEY", "")
+
+# Connection pool and request limits
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "16"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+
+# Default OpenAI-compatible endpoints for chat completion providers
+CHAT_COMPLETION_URLS = {
+    "openrouter": "https://openrouter.ai/api/v1",
+    "ollama": "http://localhost:11434/v1",
+    "openai": "https://api.openai.com/v1",
+}
+
+# Providers served by the in-process mock functions
+MOCK_PROVIDERS = ("mock", "local", "")
+
+
+class LLMBackendError(Exception):
+    """Raised when the LLM provider fails or returns an unusable response"""
+
+
+class LLMBackend(ABC):
+    """
+    Base class for HTTP LLM backends.
+
+    Each backend owns one `httpx.AsyncClient`, so connections are pooled
+    and kept alive across requests. A semaphore caps the number of
+    requests in flight to the provider.
+    """
+
+    provider = "base"
+
+    def __init__(self, base_url: str, headers: Optional[Dict[str, str]] = None):
+        self.base_url = base_url.rstrip("/")
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=headers or {},
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONCURRENCY,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        )
+        self._semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+    async def complete(self, prompt: str, flow: str) -> str:
+        """Send a prompt for the given service flow and return the generated text"""
+        async with self._semaphore:
+            try:
+                return await self._complete(prompt, flow)
+            except httpx.HTTPError as e:
+                raise LLMBackendError(f"{self.provider} request failed: {str(e)}") from e
+
+    @abstractmethod
+    async def _complete(self, prompt: str, flow: str) -> str:
+        """Make the provider request; HTTP errors are wrapped by `complete`"""
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def info(self) -> Dict:
+        return {"provider": self.provider, "base_url": self.base_url, "max_concurrency": LLM_MAX_CONCURRENCY}
+
+
+class FlowiseBackend(LLMBackend):
+    """Calls Flowise's prediction API, one chatflow per service flow"""
+
+    provider = "flowise"
+
+    def __init__(self, base_url: str = FLOWISE_API_URL, api_key: str = FLOWISE_API_KEY):
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        super().__init__(base_url, headers)
+
+    @staticmethod
+    def chatflow_id(flow: str) -> str:
+        """Look up the chatflow for a flow, e.g. FLOWISE_CHATFLOW_SUMMARIZATION"""
+        return os.getenv(f"FLOWISE_CHATFLOW_{flow.upper()}", flow)
+
+    async def _complete(self, prompt: str, flow: str) -> str:
+        response = await self._client.post(
+            f"/api/v1/prediction/{self.chatflow_id(flow)}",
+            json={"question": prompt}
+        )
+        response.raise_for_status()
+        data = response.json()
+        if "text" not in data:
+            raise LLMBackendError("Flowise response did not contain text")
+        return data["text"]
+
+
+class ChatCompletionBackend(LLMBackend):
+    """Calls an OpenAI-compatible /chat/completions endpoint (OpenRouter, Ollama, OpenAI)"""
+
+    def __init__(self, provider: str, base_url: str, api_key: str = LLM_API_KEY, model: str = LLM_MODEL):
+        self.provider = provider
+        self.model = model
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        super().__init__(base_url, headers)
+
+    async def _complete(self, prompt: str, flow: str) -> str:
+        response = await self._client.post(
+            "/chat/completions",
+            json={"model": self.model, "messages": [{"role": "user", "content": prompt}]}
+        )
+        response.raise_for_status()
+        try:
+            return response.json()["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise LLMBackendError("Chat completion response did not contain a message") from e
+
+
+_backend: Optional[LLMBackend] = None
+
+
+def create_backend(provider: str = LLM_PROVIDER) -> Optional[LLMBackend]:
+    """Build the backend for a provider, or None when the mock functions should be used"""
+    if provider in MOCK_PROVIDERS:
+        return None
+    if provider == "flowise":
+        return FlowiseBackend()
+    if provider in CHAT_COMPLETION_URLS:
+        return ChatCompletionBackend(provider, LLM_API_URL or CHAT_COMPLETION_URLS[provider])
+    raise ValueError(f"Unsupported LLM_PROVIDER: {provider}")
+
+
+def get_backend() -> Optional[LLMBackend]:
+    """Return the process-wide backend, creating it on first use"""
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+
+def backend_info() -> Dict:
+    backend = get_backend()
+    return backend.info() if backend else {"provider": "mock"}
+
+
+async def close_backend() -> None:
+    """Close the pooled client; call from the service's shutdown hook"""
+    global _backend
+    if _backend is not None:
+        await _backend.aclose()
+        _backend = None
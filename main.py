@@ -7,6 +7,7 @@ from fastapi.staticfiles import StaticFiles
 # from fastapi.templating import Jinja2Templates
 # from fastapi.responses import HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
+import importlib
 import os
 
 app = FastAPI(
@@ -27,6 +28,42 @@ app.add_middleware(
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# Serve the other services from this process instead of as separate processes on their own ports
+UNIFIED_SERVICES = os.getenv("UNIFIED_SERVICES", "false").lower() in ("1", "true", "yes")
+
+# Service name -> (module, mount path in unified mode)
+SERVICE_MOUNTS = {
+    "text_summarization": ("text_summarization", "/text-summarization"),
+    "qa_documents": ("qa_documents", "/qa-documents"),
+    "learning_path": ("learning_path", "/learning-path"),
+}
+
+mounted_services = {}
+if UNIFIED_SERVICES:
+    for service_name, (module_name, mount_path) in SERVICE_MOUNTS.items():
+        mounted_services[service_name] = importlib.import_module(module_name)
+        app.mount(mount_path, mounted_services[service_name].app, name=service_name)
+
+def preload_resources() -> None:
+    """Run the preload hooks of the mounted services; serve.py calls this before forking"""
+    for module in mounted_services.values():
+        hook = getattr(module, "preload_resources", None)
+        if hook is not None:
+            hook()
+
+# Starlette does not run the lifespan events of mounted apps, so relay them
+@app.on_event("startup")
+async def start_mounted_services():
+    for module in mounted_services.values():
+        for handler in module.app.router.on_startup:
+            await handler()
+
+@app.on_event("shutdown")
+async def stop_mounted_services():
+    for module in mounted_services.values():
+        for handler in module.app.router.on_shutdown:
+            await handler()
+
 # Setup templates
 # templates = Jinja2Templates(directory="templates")
 
@@ -51,43 +88,51 @@ async def api_root():
 @app.get("/api/services")
 async def get_services():
     """Get service status and endpoints"""
-    return {
-        "services": {
-            "text_summarization": {
-                "name": "Text Summarization Service",
-                "port": 8001,
-                "endpoints": [
-                    "/summarize",
-                    "/summarize-document"
-                ],
-                "status": "active"
-            },
-            "qa_documents": {
-                "name": "Q&A over Documents Service", 
-                "port": 8002,
-                "endpoints": [
-                    "/upload-document",
-                    "/ask"
-                ],
-                "status": "active"
-            },
-            "learning_path": {
-                "name": "Learning Path Suggestion Service",
-                "port": 8003,
-                "endpoints": [
-                    "/suggest-path",
-                    "/suggest-path-json"
-                ],
-                "status": "active"
-            },
-            "flowise": {
-                "name": "Flowise AI Orchestration",
-                "port": 3000,
-                "description": "Visual AI workflow builder",
-                "status": "active"
-            }
+    services = {
+        "text_summarization": {
+            "name": "Text Summarization Service",
+            "port": 8001,
+            "endpoints": [
+                "/summarize",
+                "/summarize/batch",
+                "/summarize/stream",
+                "/summarize/jobs",
+                "/summarize-document",
+                "/keywords"
+            ],
+            "status": "active"
+        },
+        "qa_documents": {
+            "name": "Q&A over Documents Service", 
+            "port": 8002,
+            "endpoints": [
+                "/upload-document",
+                "/documents",
+                "/ask"
+            ],
+            "status": "active"
+        },
+        "learning_path": {
+            "name": "Learning Path Suggestion Service",
+            "port": 8003,
+            "endpoints": [
+                "/suggest-path",
+                "/suggest-path-json"
+            ],
+            "status": "active"
+        },
+        "flowise": {
+            "name": "Flowise AI Orchestration",
+            "port": 3000,
+            "description": "Visual AI workflow builder",
+            "status": "active"
         }
     }
+    # In unified mode the services answer under a path of this app rather than on their own ports
+    for service_name, (_, mount_path) in SERVICE_MOUNTS.items():
+        if service_name in mounted_services:
+            services[service_name]["mount_path"] = mount_path
+    return {"mode": "unified" if UNIFIED_SERVICES else "standalone", "services": services}
 
 @app.get("/api/health")
 async def health_check():
@@ -3,14 +3,26 @@ Q&A over Documents Service
 Port: 8002
 """
 from fastapi import FastAPI, HTTPException
-# from fastapi import UploadFile, File  # Commented out due to multipart issue
+from fastapi import UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
 import os
-from typing import List, Optional
+import asyncio
+from typing import Dict, List, Optional
 import json
 from datetime import datetime
+from itertools import islice
+
+from sentence_segmenter import iter_sentence_spans, join_spans
+from document_index import DocumentCorpus, Passage, reciprocal_rank_fusion
+from document_extraction import DocumentExtractionError, detect_document_format, iter_document_text
+from embeddings import get_embedder
+from ingestion import EmptyDocumentError, ingest_document
+from job_queue import JobQueue, JobQueueFull
+from language_support import SUPPORTED_LANGUAGES
+from llm_client import LLMBackendError, backend_info, close_backend, get_backend
+from upload_utils import UploadSizeLimitMiddleware, save_upload_to_disk
 
 app = FastAPI(
     title="Q&A over Documents Service",
@@ -26,25 +38,104 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(UploadSizeLimitMiddleware, paths=["/upload-document"])
 
 # Pydantic models
 class QuestionRequest(BaseModel):
     question: str
+    retrieval: Optional[str] = None
+    nprobe: Optional[int] = None
 
 class QAResponse(BaseModel):
     question: str
     answer: str
     sources: Optional[List[str]] = None
+    source_files: Optional[List[str]] = None
 
 class UploadResponse(BaseModel):
     message: str
     filename: str
     status: str
+    job_id: Optional[str] = None
+    status_url: Optional[str] = None
+
+class IngestionJobStatus(BaseModel):
+    job_id: str
+    status: str
+    document_id: Optional[str] = None
+    filename: Optional[str] = None
+    chunks: Optional[int] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+class DocumentRequest(BaseModel):
+    filename: str
+    content: str
+    language: Optional[str] = None
+
+class DocumentResponse(BaseModel):
+    document_id: str
+    filename: str
+    chunks: int
+    status: str
+
+QA_PROMPT = (
+    "Answer the question using only the passages below. "
+    "If the passages do not contain the answer, say so.\n\n"
+    "{passages}\n\nQuestion: {question}"
+)
+
+# Corpus chunking and retrieval
+QA_CHUNK_SIZE = int(os.getenv("QA_CHUNK_SIZE", "1000"))
+QA_TOP_PASSAGES = int(os.getenv("QA_TOP_PASSAGES", "4"))
+
+# Retrieval modes for /ask: BM25 over the inverted index, cosine similarity of chunk embeddings,
+# or both run concurrently and merged by reciprocal-rank fusion
+RETRIEVAL_MODES = ("bm25", "dense", "hybrid")
+QA_RETRIEVAL = os.getenv("QA_RETRIEVAL", "hybrid")
+# Passages each hybrid leg retrieves before fusion
+QA_HYBRID_CANDIDATES = int(os.getenv("QA_HYBRID_CANDIDATES", "20"))
+
+# Documents and chunk vectors persist here (the chroma_db volume); empty keeps the corpus in memory
+QA_INDEX_DIR = os.getenv("QA_INDEX_DIR", "./chroma_db")
+
+# Dense index: "flat" scans every vector, "ivf" only the nprobe buckets closest to the query
+VECTOR_INDEXES = ("flat", "ivf")
+QA_VECTOR_INDEX = os.getenv("QA_VECTOR_INDEX", "flat")
+if QA_VECTOR_INDEX not in VECTOR_INDEXES:
+    raise ValueError(f"Unsupported QA_VECTOR_INDEX: {QA_VECTOR_INDEX}")
+QA_IVF_LISTS = int(os.getenv("QA_IVF_LISTS", "1024"))
+QA_IVF_TRAIN_SIZE = int(os.getenv("QA_IVF_TRAIN_SIZE", "50000"))
+QA_IVF_NPROBE = int(os.getenv("QA_IVF_NPROBE", "32"))
+QA_IVF_SAVE_EVERY = int(os.getenv("QA_IVF_SAVE_EVERY", "10000"))
+
+# Every document is chunked, indexed for BM25 and embedded for dense retrieval
+corpus = DocumentCorpus(
+    QA_CHUNK_SIZE,
+    QA_INDEX_DIR or None,
+    get_embedder(),
+    ivf_lists=QA_IVF_LISTS if QA_VECTOR_INDEX == "ivf" else None,
+    ivf_train_size=QA_IVF_TRAIN_SIZE,
+    ivf_save_every=QA_IVF_SAVE_EVERY,
+)
+# Loaded by the startup hook, so its files are opened by the serving process rather than at import
+documents_store = corpus.documents
+
+# Uploaded files are indexed by background jobs; until then they wait in the incoming directory,
+# with a manifest beside each, so uploads that were accepted survive a restart
+QA_INGEST_DIR = os.path.join(QA_INDEX_DIR, "incoming") if QA_INDEX_DIR else None
+# Spooled uploads get a fixed suffix whatever they were called, so an upload named "notes.json"
+# cannot be mistaken for a manifest
+SPOOL_SUFFIX = ".upload"
+QA_INGEST_WORKERS = int(os.getenv("QA_INGEST_WORKERS", "1"))
+QA_INGEST_QUEUE_SIZE = int(os.getenv("QA_INGEST_QUEUE_SIZE", "100"))
+QA_INGEST_RESULT_TTL = float(os.getenv("QA_INGEST_RESULT_TTL", "3600"))
+INGEST_RETRY_AFTER_SECONDS = 5
 
-# In-memory document storage for demo
-documents_store = {}
 # Initialize with demo document for testing
-current_document = {
+DEMO_DOCUMENT = {
     "filename": "demo_ai_document.txt",
     "content": """This is a demo document about AI and machine learning technologies. 
     
@@ -56,12 +147,84 @@ Flowise is a visual AI workflow builder that allows users to create complex AI a
     
 The microservices architecture enables building scalable applications by breaking them into smaller, independent services that communicate through APIs.
     
-RAG (Retrieval-Augmented Generation) systems combine the power of large language models with external knowledge bases to provide more accurate and contextual responses.""",
-    "upload_time": "2024-01-01T00:00:00",
-    "size": 800,
-    "processed": True
+RAG (Retrieval-Augmented Generation) systems combine the power of large language models with external knowledge bases to provide more accurate and contextual responses."""
 }
 
+def describe_ingestion_error(error: Exception) -> str:
+    """Client-facing message for a failed upload ingestion"""
+    if isinstance(error, (DocumentExtractionError, EmptyDocumentError)):
+        return str(error)
+    return f"Error indexing document: {str(error)}"
+
+ingestion_jobs = JobQueue(QA_INGEST_WORKERS, QA_INGEST_QUEUE_SIZE, QA_INGEST_RESULT_TTL, describe_ingestion_error)
+
+def manifest_path(path: str) -> str:
+    return path + ".json"
+
+def write_manifest(path: str, manifest: Dict) -> None:
+    """Durably record a spooled upload's metadata; an upload counts as accepted once this exists"""
+    temp_path = manifest_path(path) + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temp_path, manifest_path(path))
+    if os.name == "posix":
+        # Make the rename itself durable; Windows cannot open a directory as a file, and NTFS journals renames
+        directory = os.open(os.path.dirname(path), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+def discard_upload(path: str) -> None:
+    for leftover in (manifest_path(path), path):
+        try:
+            os.remove(leftover)
+        except OSError:
+            pass
+
+async def ingest_upload(path: str, manifest: Dict) -> Dict:
+    """Stream a spooled upload into the corpus, then delete it"""
+    try:
+        pieces = iter_document_text(path, manifest["format"], None)
+        document = await ingest_document(corpus, pieces, manifest["filename"], manifest.get("language"))
+    except Exception:
+        discard_upload(path)
+        raise
+    # Left in place if the job is cancelled at shutdown, so it is resumed on the next start
+    discard_upload(path)
+    return {"document_id": document["document_id"], "filename": document["filename"], "chunks": document["chunks"]}
+
+def submit_ingestion(path: str, manifest: Dict):
+    return ingestion_jobs.submit(lambda: ingest_upload(path, manifest))
+
+def source_files(passages: List[Passage]) -> List[str]:
+    """Filenames of the passages' documents, best match first, without repeats"""
+    return list(dict.fromkeys(passage.filename for passage in passages))
+
+def format_passages(passages: List[Passage]) -> str:
+    """Lay out retrieved passages for the QA prompt, each labelled with its source"""
+    return "\n\n".join(f"[{passage.filename}]\n{passage.text}" for passage in passages)
+
+async def retrieve(question: str, retrieval: str, nprobe: Optional[int] = None) -> List[Passage]:
+    """Retrieve the top passages for a question, off the event loop"""
+    loop = asyncio.get_running_loop()
+    nprobe = nprobe or QA_IVF_NPROBE
+    if retrieval == "bm25":
+        return await loop.run_in_executor(None, corpus.search, question, QA_TOP_PASSAGES)
+    if retrieval == "dense":
+        return await loop.run_in_executor(
+            None, corpus.search_vectors, question, QA_TOP_PASSAGES, None, nprobe
+        )
+    # Both legs run in the thread pool at once, so hybrid costs about the slower of the two
+    candidates = max(QA_HYBRID_CANDIDATES, QA_TOP_PASSAGES)
+    lexical, dense = await asyncio.gather(
+        loop.run_in_executor(None, corpus.search, question, candidates),
+        loop.run_in_executor(None, corpus.search_vectors, question, candidates, None, nprobe),
+    )
+    return reciprocal_rank_fusion([lexical, dense], QA_TOP_PASSAGES)
+
 def mock_qa_response(question: str, document_content: str, filename: str) -> str:
     """Mock Q&A response - in production, this would use RAG with vector embeddings"""
     
@@ -91,9 +254,10 @@ def mock_qa_response(question: str, document_content: str, filename: str) -> str
     
     elif 'summary' in question_lower or 'summarize' in question_lower:
         # Create a summary based on the document content
-        sentences = document_content.split('. ')[:3]
-        summary = '. '.join(sentences)
-        return f"""Here's a summary of the key points from the document: {summary}. The document provides comprehensive information about AI microservices architecture and implementation strategies."""
+        # Only the leading sentences are segmented; the rest of the document is never scanned
+        spans = islice(iter_sentence_spans(document_content), 3)
+        summary = join_spans(document_content, spans)
+        return f"""Here's a summary of the key points from the document: {summary} The document provides comprehensive information about AI microservices architecture and implementation strategies."""
     
     # Fallback response with content analysis
     word_count = len(document_content.split())
@@ -108,26 +272,169 @@ async def root():
     return {
         "service": "Q&A over Documents Service",
         "version": "1.0.0", 
-        "endpoints": ["/ask", "/health"],
+        "endpoints": ["/ask", "/documents", "/upload-document", "/health"],
         "status": "active",
-        "current_document": current_document["filename"] if current_document else None
+        "documents": len(documents_store)
     }
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "qa-documents"}
+    return {
+        "status": "healthy",
+        "service": "qa-documents",
+        "corpus": corpus.stats(),
+        "ingestion": ingestion_jobs.stats(),
+        "llm": backend_info()
+    }
 
-# Temporarily disable file upload endpoint due to multipart issue
-# @app.post("/upload-document", response_model=UploadResponse)
-# async def upload_document(file: UploadFile = File(...)):
-#     """Upload and process document for Q&A"""
-#     return UploadResponse(message="File upload temporarily disabled", filename="demo.txt", status="disabled")
+@app.on_event("startup")
+async def load_corpus():
+    """Rebuild the corpus from QA_INDEX_DIR, seeding the demo document into an empty one"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, corpus.load)
+    if not documents_store:
+        await loop.run_in_executor(None, corpus.add_document, DEMO_DOCUMENT["filename"], DEMO_DOCUMENT["content"])
+
+@app.on_event("startup")
+async def resume_ingestion():
+    """Queue uploads that were accepted but not indexed before the last shutdown"""
+    if QA_INGEST_DIR is None or not os.path.isdir(QA_INGEST_DIR):
+        return
+    names = set(os.listdir(QA_INGEST_DIR))
+    spooled = []
+    for name in names:
+        path = os.path.join(QA_INGEST_DIR, name)
+        if not name.endswith(SPOOL_SUFFIX):
+            if name.endswith(SPOOL_SUFFIX + ".json.tmp") or (
+                    name.endswith(SPOOL_SUFFIX + ".json") and name[:-len(".json")] not in names):
+                # An interrupted manifest write, or a manifest whose upload was already discarded
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            continue
+        if name + ".json" not in names:
+            # Interrupted before its manifest was written, so the upload was never accepted
+            discard_upload(path)
+            continue
+        try:
+            with open(manifest_path(path), encoding="utf-8") as handle:
+                spooled.append((os.path.getmtime(path), path, json.load(handle)))
+        except (OSError, ValueError):
+            discard_upload(path)
+    for _, path, manifest in sorted(spooled):
+        try:
+            submit_ingestion(path, manifest)
+        except JobQueueFull:
+            # The rest stay spooled for the next start
+            break
+
+@app.on_event("shutdown")
+async def shutdown_backend():
+    await ingestion_jobs.close()
+    await close_backend()
+    corpus.close()
+
+@app.post("/upload-document", response_model=UploadResponse, status_code=202)
+async def upload_document(file: UploadFile = File(...), language: Optional[str] = Form(None)):
+    """Queue a PDF, DOCX or plain text document for indexing; returns once it is safely on disk"""
+    path = None
+    try:
+        if language is not None and language not in SUPPORTED_LANGUAGES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported language '{language}' (available: {', '.join(SUPPORTED_LANGUAGES)})"
+            )
+        
+        loop = asyncio.get_running_loop()
+        if QA_INGEST_DIR is not None:
+            os.makedirs(QA_INGEST_DIR, exist_ok=True)
+        path = await save_upload_to_disk(file, QA_INGEST_DIR, durable=QA_INGEST_DIR is not None, suffix=SPOOL_SUFFIX)
+        manifest = {
+            "filename": file.filename or "document",
+            "language": language,
+            "format": detect_document_format(path, file.filename),
+        }
+        if QA_INGEST_DIR is not None:
+            await loop.run_in_executor(None, write_manifest, path, manifest)
+        job = submit_ingestion(path, manifest)
+        # The job owns the file from here on
+        path = None
+        
+        return UploadResponse(
+            message="Document queued for indexing",
+            filename=manifest["filename"],
+            status=job.status,
+            job_id=job.id,
+            status_url=f"/upload-document/jobs/{job.id}"
+        )
+    
+    except HTTPException:
+        raise
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(INGEST_RETRY_AFTER_SECONDS)})
+    except DocumentExtractionError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error uploading document: {str(e)}")
+    finally:
+        await file.close()
+        if path is not None:
+            discard_upload(path)
+
+@app.get("/upload-document/jobs/{job_id}", response_model=IngestionJobStatus)
+async def get_ingestion_job(job_id: str):
+    """Report the progress of an uploaded document's indexing"""
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found (unknown id or expired result)")
+    
+    status = {
+        "job_id": job.id,
+        "status": job.status,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+    if job.result is not None:
+        status.update(job.result)
+    return status
+
+@app.post("/documents", response_model=DocumentResponse)
+async def add_document(request: DocumentRequest):
+    """Add a text document to the corpus, chunked and indexed for retrieval"""
+    try:
+        if not request.content.strip():
+            raise HTTPException(status_code=400, detail="Document content cannot be empty")
+        
+        if request.language is not None and request.language not in SUPPORTED_LANGUAGES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported language '{request.language}' (available: {', '.join(SUPPORTED_LANGUAGES)})"
+            )
+        
+        loop = asyncio.get_running_loop()
+        document = await loop.run_in_executor(
+            None, corpus.add_document, request.filename, request.content, request.language
+        )
+        return DocumentResponse(
+            document_id=document["document_id"],
+            filename=document["filename"],
+            chunks=document["chunks"],
+            status="indexed"
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error indexing document: {str(e)}")
 
 @app.post("/ask", response_model=QAResponse)
 async def ask_question(request: QuestionRequest):
-    """Ask a question about the uploaded document"""
+    """Ask a question across every document in the corpus"""
     try:
-        if not current_document:
+        if not documents_store:
             raise HTTPException(
                 status_code=400,
                 detail="No document uploaded. Please upload a document first."
@@ -136,21 +443,48 @@ async def ask_question(request: QuestionRequest):
         if not request.question.strip():
             raise HTTPException(status_code=400, detail="Question cannot be empty")
         
-        # Generate answer using mock RAG
-        answer = mock_qa_response(
-            request.question, 
-            current_document["content"], 
-            current_document["filename"]
-        )
+        retrieval = request.retrieval or QA_RETRIEVAL
+        if retrieval not in RETRIEVAL_MODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown retrieval '{retrieval}' (available: {', '.join(RETRIEVAL_MODES)})"
+            )
+        
+        if request.nprobe is not None and request.nprobe < 1:
+            raise HTTPException(status_code=400, detail="nprobe must be at least 1")
+        
+        passages = await retrieve(request.question, retrieval, request.nprobe)
+        if not passages:
+            return QAResponse(
+                question=request.question,
+                answer="None of the uploaded documents contain passages matching the question.",
+                sources=[],
+                source_files=[]
+            )
+        
+        backend = get_backend()
+        if backend:
+            prompt = QA_PROMPT.format(passages=format_passages(passages), question=request.question)
+            answer = await backend.complete(prompt, "qa")
+        else:
+            # Generate answer using mock RAG over the retrieved passages
+            answer = mock_qa_response(
+                request.question,
+                " ".join(passage.text for passage in passages),
+                passages[0].filename
+            )
         
         return QAResponse(
             question=request.question,
             answer=answer,
-            sources=[current_document["filename"]]
+            sources=[passage.source for passage in passages],
+            source_files=source_files(passages)
         )
     
     except HTTPException:
         raise
+    except LLMBackendError as e:
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
 
@@ -160,13 +494,14 @@ async def list_documents():
     return {
         "documents": [
             {
+                "document_id": doc["document_id"],
                 "filename": doc["filename"],
                 "upload_time": doc["upload_time"],
-                "size": doc["size"]
+                "size": doc["size"],
+                "chunks": doc["chunks"]
             }
-            for doc in documents_store.values()
-        ],
-        "current_document": current_document["filename"] if current_document else None
+            for doc in list(documents_store.values())
+        ]
     }
 
 if __name__ == "__main__":
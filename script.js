@@ -7,9 +7,17 @@ const SERVICES = {
     flowise: 'http://localhost:3000'
 };
 
+// Keys of SERVICES -> service names reported by the gateway's /api/services
+const SERVICE_NAMES = {
+    textSummary: 'text_summarization',
+    qaDocuments: 'qa_documents',
+    learningPath: 'learning_path'
+};
+
 // DOM Content Loaded Event
-document.addEventListener('DOMContentLoaded', function() {
+document.addEventListener('DOMContentLoaded', async function() {
     initializeWebsite();
+    await resolveServiceUrls();
     checkServiceStatus();
     setupEventListeners();
     setupNavigationScroll();
@@ -144,6 +152,29 @@ function hideLoading() {
     overlay.classList.remove('active');
 }
 
+// In unified mode the gateway serves every service under a mount path instead of its own port
+async function resolveServiceUrls() {
+    try {
+        const response = await fetch(`${API_BASE_URL}/api/services`);
+        if (!response.ok) {
+            return;
+        }
+        const info = await response.json();
+        if (info.mode !== 'unified') {
+            return;
+        }
+        for (const [key, name] of Object.entries(SERVICE_NAMES)) {
+            const service = info.services[name];
+            if (service && service.mount_path) {
+                SERVICES[key] = `${API_BASE_URL}${service.mount_path}`;
+            }
+        }
+    } catch (error) {
+        // Gateway unreachable: keep the standalone service ports
+        console.warn('Could not read service layout, using standalone ports:', error);
+    }
+}
+
 // Check service status
 async function checkServiceStatus() {
     const statusIndicators = document.querySelectorAll('.status-indicator');
@@ -198,7 +229,7 @@ async function summarizeText() {
     showLoading('Generating AI summary...');
     
     try {
-        const response = await fetch(`${SERVICES.textSummary}/summarize`, {
+        const response = await fetch(`${SERVICES.textSummary}/summarize/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -208,12 +239,26 @@ async function summarizeText() {
             })
         });
         
-        if (response.ok) {
-            const result = await response.json();
-            displaySummaryResult(resultContainer, result.summary);
-        } else {
+        if (!response.ok) {
             throw new Error(`Server error: ${response.status}`);
         }
+        
+        // Render sentences as they arrive instead of waiting for the full summary
+        const sentences = [];
+        await readServerSentEvents(response, (event, data) => {
+            if (event === 'sentence') {
+                sentences.push(data.text);
+                if (sentences.length === 1) {
+                    hideLoading();
+                    displaySummaryResult(resultContainer, '');
+                }
+                resultContainer.querySelector('.result-text').textContent = `**AI Summary**: ${sentences.join(' ')}`;
+            } else if (event === 'done') {
+                displaySummaryResult(resultContainer, data.summary);
+            } else if (event === 'error') {
+                throw new Error(data.detail);
+            }
+        });
     } catch (error) {
         console.error('Error summarizing text:', error);
         showError(resultContainer, 'Failed to generate summary. Please check if the text summarization service is running.');
@@ -222,6 +267,40 @@ async function summarizeText() {
     }
 }
 
+// Read a Server-Sent Events response body, calling onEvent(event, data) per frame
+async function readServerSentEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            const dataLines = [];
+            for (const line of frame.split('\n')) {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    dataLines.push(line.slice(5).trim());
+                }
+            }
+            if (dataLines.length) {
+                onEvent(event, JSON.parse(dataLines.join('\n')));
+            }
+        }
+    }
+}
+
 // Handle summary file upload
 function handleSummaryFileUpload(event) {
     const file = event.target.files[0];
@@ -307,18 +386,27 @@ async function uploadDocumentForQA(file) {
             body: formData
         });
         
-        if (response.ok) {
-            uploadArea.innerHTML = `
-                <div class="upload-success">
-                    <i class="fas fa-check-circle" style="color: var(--success-color);"></i>
-                    <p>Document uploaded: ${file.name}</p>
-                    <button class="btn btn-secondary" onclick="uploadDocument('qa')">Upload Another</button>
-                </div>
-            `;
-            questionSection.style.display = 'block';
-        } else {
+        if (!response.ok) {
             throw new Error(`Server error: ${response.status}`);
         }
+        
+        // The upload is only queued; the document can be asked about once its indexing job succeeds
+        const upload = await response.json();
+        showLoading('Indexing document...');
+        const job = await waitForIngestion(upload.status_url);
+        if (job.status !== 'succeeded') {
+            showError(uploadArea, `Failed to index document: ${job.error || 'unknown error'}`);
+            return;
+        }
+        
+        uploadArea.innerHTML = `
+            <div class="upload-success">
+                <i class="fas fa-check-circle" style="color: var(--success-color);"></i>
+                <p>Document indexed: ${file.name} (${job.chunks} passages)</p>
+                <button class="btn btn-secondary" onclick="uploadDocument('qa')">Upload Another</button>
+            </div>
+        `;
+        questionSection.style.display = 'block';
     } catch (error) {
         console.error('Error uploading document:', error);
         showError(uploadArea, 'Failed to upload document. Please check the file format and try again.');
@@ -327,6 +415,21 @@ async function uploadDocumentForQA(file) {
     }
 }
 
+// Poll an upload's indexing job until it succeeds or fails
+async function waitForIngestion(statusUrl, intervalMs = 1000) {
+    while (true) {
+        const response = await fetch(`${SERVICES.qaDocuments}${statusUrl}`);
+        if (!response.ok) {
+            throw new Error(`Server error: ${response.status}`);
+        }
+        const job = await response.json();
+        if (job.status === 'succeeded' || job.status === 'failed') {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+}
+
 // Ask question about document
 async function askQuestion() {
     const questionInput = document.getElementById('questionText');
@@ -378,9 +481,9 @@ function displayQAResult(container, result) {
             <div class="qa-answer">
                 <strong>A:</strong> ${result.answer}
             </div>
-            ${result.sources ? `
+            ${result.source_files && result.source_files.length ? `
                 <div class="qa-sources">
-                    <strong>Sources:</strong> ${result.sources.join(', ')}
+                    <strong>Sources:</strong> ${result.source_files.join(', ')}
                 </div>
             ` : ''}
             <div class="result-actions">
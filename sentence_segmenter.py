@@ -0,0 +1,129 @@
+"""
+Sentence Segmenter
+Single-pass sentence boundary detection shared by the AI services
+"""
+import re
+from typing import AbstractSet, Iterator, List, Tuple
+
+# Lowercased tokens (without the trailing period) that do not end a sentence
+ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "etc",
+    "e.g", "i.e", "cf", "al", "approx", "vol", "inc", "ltd",
+    "co", "corp", "dept", "univ", "jan", "feb", "apr", "jun", "jul",
+    "aug", "sep", "sept", "oct", "nov", "u.s", "u.k", "ph.d",
+})
+
+# Abbreviations that are also ordinary words ("the answer was no."); they
+# only count as abbreviations before a number, as in "No. 5" or "Dec. 25"
+NUMERAL_ABBREVIATIONS = frozenset({"no", "nos", "fig", "mar", "dec"})
+
+# Longest abbreviation we need to look back over when a period is found
+_ABBREVIATION_LOOKBACK = 8
+
+# Terminal punctuation (plus closing quotes/brackets) followed by whitespace,
+# full-width CJK terminal punctuation, or a paragraph break. Single newlines
+# are handled separately.
+_BOUNDARY = re.compile(r'[.!?]+["\'\)\]]*(?=\s|$)|[。！？]+[」』）"\']*|\n[ \t]*\n\s*')
+_BOUNDARY_WITH_NEWLINES = re.compile(r'[.!?]+["\'\)\]]*(?=\s|$)|[。！？]+[」』）"\']*|\n\s*')
+
+SENTENCE_TERMINATORS = ".!?。！？"
+
+
+def _is_abbreviation(text: str, start: int, period: int, abbreviations: AbstractSet[str] = ABBREVIATIONS) -> bool:
+    """Check whether the period at `period` closes an abbreviation or initial"""
+    lookback = max(start, period - _ABBREVIATION_LOOKBACK)
+    space = max(text.rfind(" ", lookback, period), text.rfind("\n", lookback, period))
+    token_start = space + 1 if space >= 0 else lookback
+    if token_start == lookback and lookback > start:
+        # Token is longer than any known abbreviation
+        return False
+    token = text[token_start:period].lstrip("(\"'").lower()
+    if len(token) == 1 and token.isalpha():
+        # Single-letter initials such as "J. Smith"
+        return True
+    if token in NUMERAL_ABBREVIATIONS:
+        following = text[period + 1:period + 3].lstrip()
+        return following[:1].isdigit()
+    return token in abbreviations
+
+
+def _next_starts_lowercase(text: str, pos: int) -> bool:
+    """Check whether the next non-space character after `pos` is lowercase"""
+    length = len(text)
+    while pos < length and text[pos].isspace():
+        pos += 1
+    return pos < length and text[pos].islower()
+
+
+def _trim(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Shrink a span so it excludes leading and trailing whitespace"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def iter_sentence_spans(text: str, split_on_newline: bool = False,
+                        abbreviations: AbstractSet[str] = ABBREVIATIONS) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) offsets of each sentence in `text`.
+
+    The input is scanned once and no substrings are copied; slice `text`
+    with the offsets to materialize a sentence. Sentences end at `.`, `?`
+    or `!` followed by whitespace, at full-width `。`, `？` or `！`, and at
+    paragraph breaks. Periods that close common abbreviations or initials,
+    or that are followed by a lowercase word, do not end a sentence; pass
+    a language's own `abbreviations` for non-English text. With
+    `split_on_newline`, every line break is also treated as a boundary.
+    """
+    pattern = _BOUNDARY_WITH_NEWLINES if split_on_newline else _BOUNDARY
+    start = 0
+    for match in pattern.finditer(text):
+        boundary = match.start()
+        if text[boundary] == ".":
+            if _is_abbreviation(text, start, boundary, abbreviations) or _next_starts_lowercase(text, match.end()):
+                continue
+        if text[boundary] in SENTENCE_TERMINATORS:
+            span = _trim(text, start, match.end())
+        else:
+            span = _trim(text, start, boundary)
+        if span[0] < span[1]:
+            yield span
+        start = match.end()
+
+    span = _trim(text, start, len(text))
+    if span[0] < span[1]:
+        yield span
+
+
+def iter_chunk_spans(text: str, max_chars: int) -> Iterator[Tuple[int, int, int]]:
+    """
+    Group consecutive sentences into chunks of at most `max_chars`.
+
+    Yields (start, end, sentence_count) per chunk. Chunks always end on a
+    sentence boundary; a single sentence longer than `max_chars` becomes a
+    chunk of its own.
+    """
+    chunk_start = chunk_end = 0
+    count = 0
+    for start, end in iter_sentence_spans(text):
+        if count and end - chunk_start > max_chars:
+            yield chunk_start, chunk_end, count
+            count = 0
+        if not count:
+            chunk_start = start
+        chunk_end = end
+        count += 1
+    if count:
+        yield chunk_start, chunk_end, count
+
+
+def split_sentences(text: str, split_on_newline: bool = False) -> List[str]:
+    """Return the sentences of `text` as strings"""
+    return [text[start:end] for start, end in iter_sentence_spans(text, split_on_newline)]
+
+
+def join_spans(text: str, spans, separator: str = " ") -> str:
+    """Join the sentences at the given spans with a single copy of each"""
+    return separator.join(text[start:end] for start, end in spans)
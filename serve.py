@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Production launcher for the AI microservices
+
+Imports a service once, binds its listening socket, then forks N uvicorn
+workers that share the socket. Everything loaded before the fork (the
+app, language resources, memory-mapped tables) is shared between the
+workers copy-on-write instead of being rebuilt in each one. Crashed
+workers are replaced; SIGTERM or SIGINT shuts all of them down
+gracefully.
+
+Requests are spread over the workers by the kernel, so state a service
+keeps in process memory must not depend on which worker answers:
+
+- text-summarization shares its background job states through
+  SUMMARY_JOB_STATE_DIR, so a job can be polled from any worker (set it
+  to a directory all workers can reach). Incremental `document_id`
+  state is a per-worker cache; a resubmission that lands on another
+  worker is summarized in full, with the same result.
+- qa-documents (and main with UNIFIED_SERVICES, which mounts it) keeps
+  its corpus and index in memory and appends to their files, so it runs
+  on a single worker. Scale it with more instances behind a sticky load
+  balancer, each with its own QA_INDEX_DIR.
+
+Pre-forking needs os.fork, so the launcher runs on POSIX systems only;
+on Windows, run the services with uvicorn directly.
+
+The `__main__` block of each service stays a single-process reload
+server for development.
+
+Examples:
+    python serve.py learning-path --workers 4
+    python serve.py main --port 8080 --backlog 4096 --keep-alive 15
+    python serve.py qa_documents:app --port 8002
+"""
+import argparse
+import gc
+import importlib
+import os
+import signal
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+import uvicorn
+
+# Service name -> (app import string, default port)
+SERVICES: Dict[str, Tuple[str, int]] = {
+    "main": ("main:app", 8000),
+    "text-summarization": ("text_summarization:app", 8001),
+    "qa-documents": ("qa_documents:app", 8002),
+    "learning-path": ("learning_path:app", 8003),
+}
+
+# Modules whose documents or indexes live in process memory and must not be split across workers
+SINGLE_WORKER_MODULES = ("qa_documents",)
+
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 1)))
+WEB_BACKLOG = int(os.getenv("WEB_BACKLOG", "2048"))
+WEB_KEEP_ALIVE = int(os.getenv("WEB_KEEP_ALIVE", "5"))
+
+# Workers that die sooner than this after starting are not restarted in a tight loop
+RESTART_DELAY_SECONDS = 1.0
+
+
+def preload(app_path: str) -> None:
+    """Run the service module's optional `preload_resources()` hook in the parent process"""
+    module = importlib.import_module(app_path.split(":", 1)[0])
+    hook = getattr(module, "preload_resources", None)
+    if hook is not None:
+        hook()
+
+
+def run_worker(config: uvicorn.Config, sock) -> None:
+    """Serve requests in a forked worker until it is told to stop"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """Fork and watch a fixed number of workers serving one socket"""
+
+    def __init__(self, config: uvicorn.Config, workers: int):
+        self.config = config
+        self.workers = workers
+        self.sock = None
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(self.config, self.sock)
+            finally:
+                os._exit(0)
+        self.children[pid] = time.monotonic()
+
+    def stop(self, signum: int, frame) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        self.sock = self.config.bind_socket()
+        # Keep the preloaded objects out of the collector so its bookkeeping
+        # does not write to (and un-share) their pages in every worker
+        gc.freeze()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; restarting",
+                  file=sys.stderr)
+            if time.monotonic() - started < RESTART_DELAY_SECONDS:
+                time.sleep(RESTART_DELAY_SECONDS)
+            self.spawn()
+        self.sock.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run a service on several pre-forked workers")
+    parser.add_argument("service", help=f"One of {', '.join(SERVICES)}, or a module:app import string")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"), help="Interface to bind")
+    parser.add_argument("--port", type=int, default=None, help="Port to bind (defaults to the service's port)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default WEB_WORKERS, or 1 for qa-documents and unified main)")
+    parser.add_argument("--backlog", type=int, default=WEB_BACKLOG, help="Pending connections the socket queues")
+    parser.add_argument("--keep-alive", type=int, default=WEB_KEEP_ALIVE,
+                        help="Seconds an idle keep-alive connection is held open")
+    return parser.parse_args()
+
+
+def resolve_service(service: str, port: Optional[int]) -> Tuple[str, int]:
+    """Map a service name or import string to the app import string and port"""
+    if service in SERVICES:
+        app_path, default_port = SERVICES[service]
+        return app_path, port or default_port
+    if ":" not in service:
+        raise SystemExit(f"Unknown service '{service}' (available: {', '.join(SERVICES)}, or module:app)")
+    return service, port or int(os.getenv("PORT", "8000"))
+
+
+def is_single_worker(app_path: str) -> bool:
+    """Whether the app keeps state in process memory, either itself or through unified-mode mounts"""
+    module = app_path.split(":", 1)[0]
+    if module in SINGLE_WORKER_MODULES:
+        return True
+    # Read the same way main.py does, without importing every service just to ask
+    return module == "main" and os.getenv("UNIFIED_SERVICES", "false").lower() in ("1", "true", "yes")
+
+
+def main() -> None:
+    args = parse_args()
+    if not hasattr(os, "fork"):
+        raise SystemExit(
+            f"serve.py pre-forks workers with os.fork, which {sys.platform} does not support; "
+            "run the service with uvicorn directly instead (e.g. uvicorn main:app --port 8000)"
+        )
+    app_path, port = resolve_service(args.service, args.port)
+    single_worker = is_single_worker(app_path)
+    workers = args.workers or (1 if single_worker else WEB_WORKERS)
+    if workers < 1:
+        raise SystemExit("--workers must be at least 1")
+    if single_worker and workers > 1:
+        raise SystemExit(
+            f"{app_path} keeps its document corpus in process memory and must run on 1 worker "
+            f"(got --workers {workers}); scale it with more instances behind a sticky load balancer instead"
+        )
+
+    config = uvicorn.Config(
+        app_path,
+        host=args.host,
+        port=port,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+    )
+    # Import the app and its heavy resources once, before forking
+    config.load()
+    preload(app_path)
+
+    print(f"Serving {app_path} on {args.host}:{port} with {workers} workers", file=sys.stderr)
+    Supervisor(config, workers).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Single Flight
+Coalesce concurrent identical requests into one shared computation
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Run at most one computation per key at a time.
+
+    The first caller for a key starts the computation as its own task;
+    callers arriving while it is in flight await the same task instead of
+    starting another. The task is shielded, so a caller that disconnects
+    does not cancel the work for the others. Results are not retained once
+    the computation finishes; pair this with a cache for that.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        return {"in_flight": len(self._in_flight), "started": self.started, "coalesced": self.coalesced}
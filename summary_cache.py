@@ -0,0 +1,102 @@
+"""
+Summary Cache
+Content-addressed, memory-bounded LRU cache with TTL expiry
+"""
+import hashlib
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+def make_cache_key(text: str, strategy: str, **options) -> str:
+    """
+    Build a cache key from a hash of the exact text, the strategy and any options.
+
+    The text is hashed as is: whitespace decides sentence boundaries (a
+    blank line ends a sentence) and the character offsets in structured
+    output, so texts that differ only in spacing must not share a result.
+    """
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+    option_key = ",".join(f"{name}={options[name]}" for name in sorted(options))
+    return f"{digest}:{strategy}:{option_key}"
+
+
+class SummaryCache:
+    """
+    LRU cache of rendered summaries, stored as encoded bytes, bounded by total memory.
+
+    Entries older than `ttl_seconds` are treated as misses and dropped.
+    When the stored values exceed `max_bytes`, least recently used entries
+    are evicted first. A `max_bytes` of 0 disables caching.
+
+    The cache is not thread-safe; use it from the event loop only.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[bytes, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at, size = entry
+        if expires_at <= time.monotonic():
+            self._remove(key, size)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+
+        existing = self._entries.get(key)
+        if existing is not None:
+            self._remove(key, existing[2])
+
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest_key, (_, _, oldest_size) = next(iter(self._entries.items()))
+            self._remove(oldest_key, oldest_size)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key: str, size: int) -> None:
+        del self._entries[key]
+        self._bytes -= size
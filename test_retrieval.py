@@ -0,0 +1,249 @@
+"""
+Unit tests for the Q&A retrieval internals
+"""
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from ann_index import IVFIndex, normalize_rows
+from document_index import DocumentCorpus, InvertedIndex, Passage, reciprocal_rank_fusion
+from embeddings import HashingEmbedder
+from ingestion import EmptyDocumentError, cut_batches, ingest_document
+import qa_documents
+from vector_store import VectorStore
+
+TOPICS = ["solar panels", "wind turbines", "battery storage", "power grids", "heat pumps"]
+
+
+def make_text(sentences: int, offset: int = 0) -> str:
+    return " ".join(
+        f"Sentence {i} explains how {TOPICS[(i + offset) % len(TOPICS)]} work in practice." for i in range(sentences)
+    )
+
+
+async def pieces_of(text: str, size: int, fail_after: int = None):
+    """Yield `text` in pieces of `size` characters, raising once `fail_after` pieces have been sent"""
+    for count, start in enumerate(range(0, len(text), size)):
+        if count == fail_after:
+            raise RuntimeError("extraction failed")
+        yield text[start:start + size]
+        await asyncio.sleep(0)
+
+
+def test_ivf_recall():
+    """IVF search finds most of the exact top-k, and all of it when every bucket is probed"""
+    rng = np.random.default_rng(0)
+    dim, clusters, k = 32, 20, 10
+    centers = normalize_rows(rng.standard_normal((clusters, dim)))
+    vectors = centers[rng.integers(clusters, size=5000)] + 0.05 * rng.standard_normal((5000, dim))
+    vectors = normalize_rows(vectors).astype(np.float32)
+
+    store = VectorStore(dim)
+    store.add(vectors)
+    index = IVFIndex(store, nlist=32, train_size=2000)
+    index.add()
+    assert index.trained
+
+    # Queries near the data, as a query embedding is near the chunks it matches
+    queries = vectors[rng.integers(len(vectors), size=50)] + 0.05 * rng.standard_normal((50, dim))
+    queries = normalize_rows(queries).astype(np.float32)
+    recalls = []
+    for query in queries:
+        exact = {row for row, _ in store.search(query, k)[0]}
+        assert {row for row, _ in index.search(query, k, nprobe=index.nlist)} == exact
+        approximate = {row for row, _ in index.search(query, k, nprobe=8)}
+        recalls.append(len(approximate & exact) / k)
+    assert np.mean(recalls) >= 0.9
+
+
+def test_ingest_document_matches_add_document():
+    text = make_text(200)
+    streamed = DocumentCorpus(chunk_size=300, embedder=HashingEmbedder(64))
+    document = asyncio.run(ingest_document(streamed, pieces_of(text, 997), "streamed.txt", "en", queue_size=2))
+    whole = DocumentCorpus(chunk_size=300, embedder=HashingEmbedder(64))
+    whole.add_document("whole.txt", text, "en")
+
+    assert document["content"] == text
+    assert document["size"] == len(text)
+    assert [chunk.start for chunk in streamed.chunks] == [chunk.start for chunk in whole.chunks]
+    assert len(streamed.vectors) == len(whole.vectors) == document["chunks"]
+    hits = streamed.search("battery storage", 5, "en")
+    assert [passage.text for passage in hits] == [passage.text for passage in whole.search("battery storage", 5, "en")]
+
+
+def test_ingest_document_rolls_back_a_failed_document():
+    corpus = DocumentCorpus(chunk_size=300, embedder=HashingEmbedder(64))
+    kept = corpus.add_document("kept.txt", make_text(20), "en")
+    before = corpus.stats()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(ingest_document(corpus, pieces_of(make_text(400, 2), 500, fail_after=20), "broken.txt", "en",
+                                    queue_size=1))
+    assert corpus.stats() == before
+    assert list(corpus.documents) == [kept["document_id"]]
+    assert len(corpus.index) == len(corpus.chunks) == len(corpus.vectors)
+    assert all(passage.filename == "kept.txt" for passage in corpus.search("heat pumps", 10, "en"))
+
+    # The corpus is released, so the next document can be added
+    corpus.add_document("next.txt", make_text(5), "en")
+    assert len(corpus.documents) == 2
+
+
+def test_ingest_document_rejects_empty_documents():
+    corpus = DocumentCorpus(chunk_size=300)
+    with pytest.raises(EmptyDocumentError):
+        asyncio.run(ingest_document(corpus, pieces_of("   \n\n   ", 4), "blank.txt", "en"))
+    assert not corpus.documents and not corpus.chunks
+
+
+def test_chunks_of_a_document_being_written_are_searchable():
+    corpus = DocumentCorpus(chunk_size=300)
+    text = make_text(40)
+    consumed, batches = cut_batches(corpus, text, "en", final=True, batch_chunks=2)
+    writer = corpus.open_document("partial.txt", "en")
+    for fragment, spans, term_counts in batches[:3]:
+        writer.append(fragment, spans, term_counts, None)
+
+    passages = corpus.search("wind turbines", 10, "en")
+    assert passages
+    for passage in passages:
+        chunk = corpus.chunks[passage.chunk_id]
+        assert passage.text == text[chunk.start:chunk.end]
+
+    for fragment, spans, term_counts in batches[3:]:
+        writer.append(fragment, spans, term_counts, None)
+    document = writer.commit()
+    assert document["content"] == text
+    assert document["size"] == consumed == len(text)
+
+
+def test_resume_ingestion_resumes_accepted_uploads_only(tmp_path, monkeypatch):
+    # Spooled under the fixed suffix, so an upload called notes.json is not mistaken for a manifest
+    accepted = str(tmp_path / ("tmpaccepted" + qa_documents.SPOOL_SUFFIX))
+    manifest = {"filename": "notes.json", "language": None, "format": "txt"}
+    with open(accepted, "w", encoding="utf-8") as handle:
+        handle.write('{"notes": "Solar panels work in practice."}')
+    qa_documents.write_manifest(accepted, manifest)
+    # Never accepted: its manifest was not written
+    (tmp_path / ("tmpunaccepted" + qa_documents.SPOOL_SUFFIX)).write_text("partial")
+    # Left behind by a discarded upload, and by an interrupted manifest write
+    (tmp_path / ("tmpdiscarded" + qa_documents.SPOOL_SUFFIX + ".json")).write_text("{}")
+    (tmp_path / ("tmptorn" + qa_documents.SPOOL_SUFFIX + ".json.tmp")).write_text("{")
+
+    submitted = []
+    monkeypatch.setattr(qa_documents, "QA_INGEST_DIR", str(tmp_path))
+    monkeypatch.setattr(qa_documents, "submit_ingestion", lambda path, manifest: submitted.append((path, manifest)))
+    asyncio.run(qa_documents.resume_ingestion())
+
+    assert submitted == [(accepted, manifest)]
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(accepted), os.path.basename(accepted) + ".json"])
+
+
+def test_bm25_scores():
+    index = InvertedIndex()
+    index.add([{"solar": 2, "panel": 1}, {"wind": 1, "turbine": 1}, {"solar": 1, "wind": 3, "farm": 2}])
+    n_chunks, average_length = 3, 11 / 3
+
+    def bm25(frequency, document_frequency, length):
+        idf = np.log(1.0 + (n_chunks - document_frequency + 0.5) / (document_frequency + 0.5))
+        norm = 1.2 * (1.0 - 0.75 + 0.75 * length / average_length)
+        return idf * frequency * 2.2 / (frequency + norm)
+
+    hits = dict(index.search(["solar"], 10))
+    assert hits == pytest.approx({0: bm25(2, 2, 3), 2: bm25(1, 2, 6)})
+    # A chunk matching several query terms sums their contributions; repeated query terms count once
+    hits = index.search(["solar", "wind", "solar"], 10)
+    assert [chunk_id for chunk_id, _ in hits] == [2, 0, 1]
+    assert hits[0][1] == pytest.approx(bm25(1, 2, 6) + bm25(3, 2, 6))
+    assert index.search(["solar", "wind"], 1) == hits[:1]
+    assert index.search(["unknown"], 10) == []
+
+
+def test_inverted_index_truncate_forgets_later_chunks():
+    index = InvertedIndex()
+    index.add([{"solar": 1}, {"solar": 2, "wind": 1}])
+    expected = index.search(["solar", "wind"], 10)
+    index.add([{"solar": 5, "grid": 1}, {"grid": 2}])
+    index.truncate(2)
+    assert len(index) == 2 and index.terms == 2
+    assert index.search(["solar", "wind", "grid"], 10) == expected
+
+
+def test_corpus_reloads_saved_postings_without_tokenizing(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    corpus = DocumentCorpus(chunk_size=300, directory=directory)
+    corpus.load()
+    corpus.add_document("first.txt", make_text(30), "en")
+    corpus.close()
+    corpus = DocumentCorpus(chunk_size=300, directory=directory)
+    corpus.load()
+    # Added after the postings were saved, and never closed
+    second = corpus.add_document("second.txt", make_text(20, 2), "en")
+    expected = corpus.search("battery storage", 5, "en")
+
+    tokenized = []
+    count_terms = DocumentCorpus.count_terms
+    monkeypatch.setattr(DocumentCorpus, "count_terms",
+                        lambda self, content, spans, language: tokenized.append(len(spans)) or
+                        count_terms(self, content, spans, language))
+    reloaded = DocumentCorpus(chunk_size=300, directory=directory)
+    reloaded.load()
+    assert sum(tokenized) == second["chunks"] > 0
+    assert reloaded.search("battery storage", 5, "en") == expected
+
+    # The postings saved by that load cover every chunk, and another chunk size ignores them
+    tokenized.clear()
+    DocumentCorpus(chunk_size=300, directory=directory).load()
+    assert sum(tokenized) == 0
+    DocumentCorpus(chunk_size=200, directory=directory).load()
+    assert sum(tokenized) == len(reloaded.chunks)
+
+
+def passage(chunk_id: int, score: float) -> Passage:
+    return Passage(chunk_id, score, "doc", chunk_id, "doc.txt", f"chunk {chunk_id}")
+
+
+def test_reciprocal_rank_fusion_sums_reciprocal_ranks():
+    lexical = [passage(1, 12.0), passage(2, 9.0), passage(3, 1.0)]
+    dense = [passage(3, 0.9), passage(1, 0.8), passage(4, 0.7)]
+    fused = reciprocal_rank_fusion([lexical, dense], k=10, rrf_k=60)
+
+    assert [p.chunk_id for p in fused] == [1, 3, 2, 4]
+    assert fused[0].score == pytest.approx(1 / 61 + 1 / 62)
+    assert fused[1].score == pytest.approx(1 / 63 + 1 / 61)
+    assert fused[2].score == pytest.approx(1 / 62)
+    # Only ranks matter, not the scale of either list's scores
+    rescaled = [[p._replace(score=p.score * 1000) for p in lexical], dense]
+    assert reciprocal_rank_fusion(rescaled, k=10, rrf_k=60) == fused
+    assert fused[0].text == "chunk 1"
+
+
+def test_reciprocal_rank_fusion_top_k_and_ties():
+    fused = reciprocal_rank_fusion([[passage(5, 1.0), passage(2, 0.5)], [passage(2, 1.0), passage(5, 0.5)]], k=1)
+    # Equal fused scores fall back to the lower chunk id
+    assert [p.chunk_id for p in fused] == [2]
+    assert reciprocal_rank_fusion([[], []], k=3) == []
+
+
+def test_ivf_training_runs_outside_the_corpus_lock(monkeypatch):
+    corpus = DocumentCorpus(chunk_size=300, embedder=HashingEmbedder(64), ivf_lists=4, ivf_train_size=8)
+    add = IVFIndex.add
+    during_add = []
+
+    def checked_add(index, limit=None):
+        # BM25 searches take the corpus lock, so it must be free while the index trains or saves
+        during_add.append((corpus._lock.locked(), len(corpus.search("solar panels", 3, "en"))))
+        add(index, limit)
+
+    monkeypatch.setattr(IVFIndex, "add", checked_add)
+    corpus.add_document("first.txt", make_text(30), "en")
+    asyncio.run(ingest_document(corpus, pieces_of(make_text(60, 1), 400), "second.txt", "en"))
+
+    assert during_add and all(not locked and found for locked, found in during_add)
+    assert corpus.ann.trained and corpus.ann.stats()["indexed"] == len(corpus.chunks)
+    # Probing every bucket is an exact search
+    exact = corpus.vectors.search(corpus.embedder.embed(["battery storage"], "en"), 5)[0]
+    hits = corpus.search_vectors("battery storage", 5, "en", nprobe=4)
+    assert [p.chunk_id for p in hits] == [row for row, _ in exact]
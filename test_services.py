@@ -10,6 +10,11 @@ TEXT_SUMMARIZATION_URL = "http://localhost:8001"
 QA_DOCUMENTS_URL = "http://localhost:8002"
 LEARNING_PATH_URL = "http://localhost:8003"
 
+SAMPLE_TEXT = (
+    "Machine learning models learn patterns from data. Neural networks stack many layers of simple units. "
+    "Training needs a lot of labelled examples. Evaluation uses a held-out test set."
+)
+
 def test_main_service():
     """Test the main service"""
     print("Testing Main Service...")
@@ -90,6 +95,72 @@ def test_learning_path_service():
     except Exception as e:
         print(f"Error testing learning path service health: {e}")
 
+def test_summary_batch():
+    """Test summarizing several texts in one batch request"""
+    print("\nTesting Summary Batch...")
+    
+    try:
+        response = requests.post(f"{TEXT_SUMMARIZATION_URL}/summarize/batch",
+                                 json={"texts": [SAMPLE_TEXT, SAMPLE_TEXT, "Too short."],
+                                       "strategy": "tfidf", "max_sentences": 2})
+        result = response.json()
+        print(f"Batch endpoint: {response.status_code}")
+        print(f"Succeeded: {result.get('succeeded')}, failed: {result.get('failed')}")
+    except Exception as e:
+        print(f"Error testing summary batch: {e}")
+        return
+    
+    assert response.status_code == 200
+    assert [item["index"] for item in result["results"]] == [0, 1, 2]
+    assert result["succeeded"] == 2 and result["failed"] == 1
+    assert result["results"][0]["summary"] == result["results"][1]["summary"]
+
+def test_summary_stream():
+    """Test streaming a summary as Server-Sent Events"""
+    print("\nTesting Summary Stream...")
+    
+    try:
+        response = requests.post(f"{TEXT_SUMMARIZATION_URL}/summarize/stream",
+                                 json={"text": SAMPLE_TEXT, "strategy": "tfidf", "max_sentences": 2}, stream=True)
+        events = [line[len("event: "):] for line in response.iter_lines(decode_unicode=True)
+                  if line.startswith("event: ")]
+        print(f"Stream endpoint: {response.status_code} ({response.headers.get('content-type')})")
+        print(f"Events: {events}")
+    except Exception as e:
+        print(f"Error testing summary stream: {e}")
+        return
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert events == ["start", "sentence", "sentence", "done"]
+
+def test_summary_jobs():
+    """Test submitting a background summary job and polling it until it finishes"""
+    print("\nTesting Summary Jobs...")
+    
+    try:
+        response = requests.post(f"{TEXT_SUMMARIZATION_URL}/summarize/jobs",
+                                 json={"text": SAMPLE_TEXT, "strategy": "tfidf", "max_sentences": 2})
+        job = response.json()
+        print(f"Job submit endpoint: {response.status_code}")
+        status = job
+        for _ in range(50):
+            status = requests.get(f"{TEXT_SUMMARIZATION_URL}{job['status_url']}").json()
+            if status["status"] in ("succeeded", "failed"):
+                break
+            time.sleep(0.2)
+        print(f"Job status: {status['status']}")
+        missing = requests.get(f"{TEXT_SUMMARIZATION_URL}/summarize/jobs/unknown")
+        print(f"Unknown job: {missing.status_code}")
+    except Exception as e:
+        print(f"Error testing summary jobs: {e}")
+        return
+    
+    assert response.status_code == 202
+    assert status["status"] == "succeeded"
+    assert status["summary"].startswith("**AI Summary**")
+    assert missing.status_code == 404
+
 def main():
     """Main test function"""
     print("Starting AI Microservices Tests...")
@@ -101,6 +172,9 @@ def main():
     # Test each service
     test_main_service()
     test_text_summarization_service()
+    test_summary_batch()
+    test_summary_stream()
+    test_summary_jobs()
     test_qa_documents_service()
     test_learning_path_service()
     
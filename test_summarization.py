@@ -0,0 +1,275 @@
+"""
+Unit tests for the summarization and retrieval internals
+"""
+import asyncio
+import os
+import random
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+# Tests must neither read nor update the service's corpus IDF store or job states
+os.environ["IDF_STORE_PATH"] = ""
+os.environ["SUMMARY_JOB_STATE_DIR"] = ""
+
+from extractive_summarizer import build_term_statistics, extract_keyphrases, extract_keywords, select_top_sentences
+from idf_store import IDFStore
+from incremental_summarizer import IncrementalDocument
+from job_queue import Job, JobQueue, JobQueueFull
+from language_support import get_language
+from sentence_segmenter import iter_sentence_spans, split_sentences
+from summary_cache import make_cache_key
+import text_summarization
+from text_summarization import SummaryLength, extract_summary, format_summary, truncate_summary
+
+SENTENCES = [
+    "Machine learning models learn patterns from data.",
+    "Dr. Smith trained the model on No. 5 of the datasets.",
+    "The answer was no.",
+    "Neural networks stack many layers of simple units.",
+    "Training needs a lot of labelled examples!",
+    "Is the model overfitting the data?",
+    "Regularization keeps the weights small, e.g. with weight decay.",
+    "Evaluation uses a held-out test set.",
+]
+
+
+def full_pass(text, language="en"):
+    """A fresh document built from `text` in one update"""
+    document = IncrementalDocument("full", language)
+    document.update(text)
+    return document
+
+
+def test_incremental_document_matches_full_pass():
+    """Random edits applied incrementally give the same spans and scores as re-processing the text"""
+    rng = random.Random(0)
+    document = IncrementalDocument("doc", "en")
+    text = " ".join(rng.choice(SENTENCES) for _ in range(30))
+    document.update(text)
+
+    for _ in range(200):
+        start = rng.randrange(len(text) + 1)
+        end = min(len(text), start + rng.randrange(80))
+        insert = rng.choice(["", " ", "\n\n", rng.choice(SENTENCES), rng.choice(SENTENCES)[:rng.randrange(1, 20)]])
+        text = text[:start] + insert + text[end:]
+        document.update(text)
+
+        expected = full_pass(text)
+        assert document.spans == expected.spans
+        assert document.spans == list(iter_sentence_spans(text, abbreviations=get_language("en").abbreviations))
+        if not expected.spans:
+            continue
+        for strategy in ("tfidf", "textrank"):
+            np.testing.assert_allclose(document.scores(strategy), expected.scores(strategy), rtol=1e-6, atol=1e-9)
+
+
+def test_incremental_document_reuses_unchanged_sentences():
+    text = " ".join(SENTENCES * 10)
+    document = IncrementalDocument("doc", "en")
+    document.update(text)
+    document.update(text.replace("Evaluation uses", "Evaluation often uses", 1))
+    assert document.last_rescanned <= 3
+    assert document.last_reused == len(document.spans) - document.last_rescanned
+
+
+def test_cache_key_hashes_exact_text():
+    text = "First sentence.\n\nSecond sentence."
+    assert make_cache_key(text, "tfidf") == make_cache_key(text, "tfidf")
+    # Whitespace changes sentence boundaries and offsets, so it must change the key
+    assert make_cache_key(text, "tfidf") != make_cache_key("First sentence. Second sentence.", "tfidf")
+    assert make_cache_key(text, "tfidf") != make_cache_key(text + " ", "tfidf")
+    assert make_cache_key(text, "tfidf") != make_cache_key(text.upper(), "tfidf")
+
+
+def test_cache_key_includes_strategy_and_options():
+    text = "Some text to summarize."
+    assert make_cache_key(text, "tfidf") != make_cache_key(text, "textrank")
+    assert make_cache_key(text, "tfidf", max_sentences=3) != make_cache_key(text, "tfidf", max_sentences=4)
+    assert make_cache_key(text, "tfidf", max_sentences=3, language="en") == \
+        make_cache_key(text, "tfidf", language="en", max_sentences=3)
+
+
+def test_segmenter_keeps_abbreviations_and_initials_inside_sentences():
+    assert split_sentences("Dr. Smith met Mr. J. R. Jones at St. Mary's. They talked.") == [
+        "Dr. Smith met Mr. J. R. Jones at St. Mary's.", "They talked."]
+    assert split_sentences("Bring tools, e.g. hammers. Then start.") == ["Bring tools, e.g. hammers.", "Then start."]
+
+
+def test_segmenter_treats_numeral_abbreviations_as_words_without_a_number():
+    assert split_sentences("The answer was no. Then we left the room.") == [
+        "The answer was no.", "Then we left the room."]
+    assert split_sentences("Item No. 5 was sold. We bought a fig. It was sweet.") == [
+        "Item No. 5 was sold.", "We bought a fig.", "It was sweet."]
+    assert split_sentences("See Fig. 3 and Dec. 25 for details. Done.") == [
+        "See Fig. 3 and Dec. 25 for details.", "Done."]
+
+
+def test_segmenter_boundaries():
+    assert split_sentences("Is it? Yes! It ended (\"quietly.\") Next") == [
+        "Is it?", "Yes!", "It ended (\"quietly.\")", "Next"]
+    assert split_sentences("A version 2.5 release. the next word is lowercase.") == [
+        "A version 2.5 release. the next word is lowercase."]
+    assert split_sentences("Heading\n\nBody text") == ["Heading", "Body text"]
+    assert split_sentences("line one\nline two", split_on_newline=True) == ["line one", "line two"]
+    assert split_sentences("第一句。第二句！") == ["第一句。", "第二句！"]
+
+
+def test_sentence_count_from_max_sentences_and_ratio():
+    assert SummaryLength().sentence_count(2) == 2
+    assert SummaryLength(max_sentences=4).sentence_count(10) == 4
+    assert SummaryLength(ratio=0.25).sentence_count(10) == 3
+    assert SummaryLength(ratio=0.01).sentence_count(10) == 1
+    # The tighter of the two limits wins
+    assert SummaryLength(max_sentences=2, ratio=0.5).sentence_count(10) == 2
+    assert SummaryLength(max_sentences=8, ratio=0.5).sentence_count(10) == 5
+
+
+def test_select_top_sentences_fits_the_character_budget():
+    scores = [0.9, 0.8, 0.7, 0.1]
+    lengths = [30, 50, 20, 10]
+    assert select_top_sentences(scores, 3, lengths) == [0, 1, 2]
+    # The best sentence fits, the second would overflow and is skipped, the third fits
+    assert select_top_sentences(scores, 3, lengths, max_chars=60) == [0, 2]
+    # Nothing fits: the best sentence is returned alone, to be truncated
+    assert select_top_sentences(scores, 3, lengths, max_chars=5) == [0]
+
+
+def test_extract_summary_respects_max_chars():
+    text = " ".join(SENTENCES)
+    for strategy in ("simple", "tfidf", "textrank"):
+        for max_chars in (40, 80, 160):
+            summary = extract_summary(text, strategy, SummaryLength(max_sentences=3, max_chars=max_chars), "en")
+            assert 0 < len(summary) <= max_chars
+
+
+def test_truncated_summary_ends_in_a_single_ellipsis():
+    truncated = truncate_summary("Sentence number zero is quite long indeed.", 20)
+    assert truncated == "Sentence number…"
+    assert format_summary(truncated, 1, "tfidf").startswith("**AI Summary**: Sentence number…\n")
+    assert format_summary("Short one", 1, "tfidf").startswith("**AI Summary**: Short one.\n")
+
+
+def test_job_queue_rejects_jobs_beyond_its_capacity():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def blocked():
+            await release.wait()
+            return "done"
+
+        queue = JobQueue(workers=1, max_queued=1, result_ttl=60)
+        running = queue.submit(blocked)
+        await asyncio.sleep(0)
+        waiting = queue.submit(blocked)
+        with pytest.raises(JobQueueFull):
+            queue.submit(blocked)
+        assert queue.stats()["rejected"] == 1
+        assert (running.status, waiting.status) == ("running", "queued")
+
+        release.set()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert (running.status, waiting.status) == ("succeeded", "succeeded")
+        assert queue.get(waiting.id).result == "done"
+        # Capacity is available again once the queue drains
+        queue.submit(blocked)
+        await queue.close()
+
+    asyncio.run(scenario())
+
+
+def test_job_states_are_shared_through_the_state_directory(tmp_path):
+    async def scenario():
+        release = asyncio.Event()
+
+        async def summary():
+            await release.wait()
+            return b'{"summary": "done"}'
+
+        worker = JobQueue(workers=1, max_queued=4, result_ttl=60, state_dir=str(tmp_path))
+        other = JobQueue(workers=1, max_queued=4, result_ttl=60, state_dir=str(tmp_path))
+        job = worker.submit(summary)
+        await asyncio.sleep(0)
+        assert other.get(job.id).status == "running"
+        release.set()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        polled = other.get(job.id)
+        assert (polled.status, polled.result) == ("succeeded", b'{"summary": "done"}')
+        assert other.get("../" + job.id) is None and other.get("0" * 32) is None
+        await worker.close()
+
+        # A job whose process is gone is reported as failed rather than running forever
+        orphan = Job(None)
+        worker._save_state(orphan)
+        state_path = tmp_path / f"{orphan.id}.job"
+        header, _ = state_path.read_bytes().split(b"\n", 1)
+        state_path.write_bytes(header.replace(f'"pid": {os.getpid()}'.encode(), b'"pid": 999999999') + b"\n")
+        assert other.get(orphan.id).status == "failed"
+
+        # Expired results are dropped from the directory too
+        expired = JobQueue(workers=1, max_queued=4, result_ttl=0, state_dir=str(tmp_path))
+        assert expired.get(job.id) is None
+        assert not (tmp_path / f"{job.id}.job").exists()
+
+    asyncio.run(scenario())
+
+
+def test_full_job_queue_returns_429(monkeypatch):
+    # No workers, so the single queue slot stays taken
+    monkeypatch.setattr(text_summarization, "summary_jobs", JobQueue(workers=0, max_queued=1, result_ttl=60))
+    request = {"text": " ".join(SENTENCES), "strategy": "tfidf"}
+    with TestClient(text_summarization.app) as client:
+        assert client.post("/summarize/jobs", json=request).status_code == 202
+        response = client.post("/summarize/jobs", json=request)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(text_summarization.JOB_RETRY_AFTER_SECONDS)
+
+
+def test_idf_store_counts_documents_and_persists(tmp_path):
+    path = str(tmp_path / "idf.bin")
+    store = IDFStore(path, buckets=1024, min_documents=2)
+    store.add_document({"model", "data"})
+    assert store.idf(["model"]) is None
+    store.add_document({"model"})
+    assert store.documents == 2
+
+    idf = store.idf(["model", "data", "unseen"])
+    np.testing.assert_allclose(idf, np.log(3.0 / np.array([3.0, 2.0, 1.0])) + 1.0)
+    assert idf[0] < idf[1] < idf[2]
+
+    # Another mapping of the same file sees the updates, and keeps the file's bucket count
+    store.flush()
+    reopened = IDFStore(path, buckets=64, min_documents=2)
+    assert reopened.buckets == 1024
+    assert reopened.documents == 2
+    reopened.add_document({"data"})
+    assert store.documents == 3
+    np.testing.assert_allclose(store.idf(["data"]), reopened.idf(["data"]))
+
+
+def test_idf_store_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not an idf store" * 4)
+    with pytest.raises(ValueError):
+        IDFStore(str(path), buckets=16)
+
+
+def test_keywords_rank_repeated_terms_above_short_sentences():
+    text = (
+        "Utilities connect rooftop installations, community batteries and wind farms to the regional grid every year. "
+        "Cats sleep. Engineers upgrade transformers, substations and transmission lines so the grid handles evening "
+        "demand peaks. Weather matters."
+    )
+    statistics = build_term_statistics(text, list(iter_sentence_spans(text)), "en")
+    keywords = extract_keywords(statistics, 5)
+    # Terms of the two-word sentences must not outrank the only repeated term
+    assert keywords[0][0] == "grid"
+    assert all(term not in ("cats", "sleep", "weather", "matters") for term, _ in keywords)
+
+    phrases = "Solar panels cut bills. Cats sleep. Solar panels need sun. Weather matters."
+    statistics = build_term_statistics(phrases, list(iter_sentence_spans(phrases)), "en")
+    # Each term scores count x IDF: 2 x (1 + ln(5/3)), both terms occur only in the pair
+    assert extract_keyphrases(statistics, 3) == [("solar panels", pytest.approx(2 * 2 * (1 + np.log(5 / 3))))]
@@ -3,17 +3,40 @@ Text Summarization Service
 Port: 8001
 """
 from fastapi import FastAPI, HTTPException
-# from fastapi import UploadFile, File  # Commented out due to multipart issue
+from fastapi import UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 import os
-from typing import Optional
+import json
+import math
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from sentence_segmenter import SENTENCE_TERMINATORS, iter_chunk_spans, iter_sentence_spans, join_spans
+from extractive_summarizer import (STRATEGIES, TermStatistics, build_term_statistics, extract_keyphrases,
+                                   extract_keywords, score_matrix, select_sentences, select_top_sentences)
+from upload_utils import UploadSizeLimitMiddleware, save_upload_to_disk
+from document_extraction import DocumentExtractionError, detect_document_format, iter_document_text
+from summary_cache import SummaryCache, make_cache_key
+from single_flight import SingleFlight
+from job_queue import JobQueue, JobQueueFull
+from incremental_summarizer import DocumentStore, IncrementalDocument
+from idf_store import IDFStore
+from llm_client import LLMBackendError, backend_info, close_backend, get_backend
+from language_support import (DEFAULT_LANGUAGE, SUPPORTED_LANGUAGES, LanguageResources, detect_language,
+                              get_language, loaded_languages)
 
 app = FastAPI(
     title="Text Summarization Service",
     description="AI-powered text summarization using LangChain and LLMs",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -25,89 +48,948 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized uploads while they stream in rather than after buffering
+app.add_middleware(UploadSizeLimitMiddleware, paths=["/summarize-document"])
+
 # Pydantic models
 class TextSummaryRequest(BaseModel):
     text: str
+    strategy: Optional[str] = None
+    max_sentences: Optional[int] = None
+    max_chars: Optional[int] = None
+    ratio: Optional[float] = None
+    language: Optional[str] = None
+    document_id: Optional[str] = None
+    format: Optional[str] = None
+    keywords: Optional[int] = None
+    map_reduce: bool = False
+    chunk_size: Optional[int] = None
+    fan_out: Optional[int] = None
 
 class SummaryResponse(BaseModel):
     summary: str
 
-# Mock LLM response for demonstration
-def mock_summarize_text(text: str) -> str:
-    """Mock text summarization - in production, this would use LangChain + LLM"""
-    # Simple extractive summarization simulation
-    sentences = text.split('. ')
-    if len(sentences) <= 3:
-        return text
-    
-    # Take first, middle, and last sentences as a simple summary
-    summary_sentences = [
-        sentences[0],
-        sentences[len(sentences)//2] if len(sentences) > 2 else "",
-        sentences[-1] if sentences[-1].strip() else sentences[-2]
-    ]
+class SummarySentence(BaseModel):
+    index: int
+    start: int
+    end: int
+    text: str
+
+class Keyword(BaseModel):
+    text: str
+    score: float
+
+class FormattedSummaryResponse(BaseModel):
+    summary: str
+    format: str
+    strategy: Optional[str] = None
+    total_sentences: Optional[int] = None
+    truncated: Optional[bool] = None
+    sentences: Optional[List[SummarySentence]] = None
+    keywords: Optional[List[Keyword]] = None
+    keyphrases: Optional[List[Keyword]] = None
+
+class KeywordRequest(BaseModel):
+    text: str
+    language: Optional[str] = None
+    count: Optional[int] = None
+
+class KeywordResponse(BaseModel):
+    language: str
+    keywords: List[Keyword]
+    keyphrases: List[Keyword]
+
+class BatchSummaryRequest(BaseModel):
+    texts: List[str]
+    strategy: Optional[str] = None
+    max_sentences: Optional[int] = None
+    max_chars: Optional[int] = None
+    ratio: Optional[float] = None
+    language: Optional[str] = None
+
+class BatchSummaryItem(BaseModel):
+    index: int
+    summary: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchSummaryResponse(BaseModel):
+    results: List[BatchSummaryItem]
+    succeeded: int
+    failed: int
+
+class SummaryJobResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+class SummaryJobStatus(BaseModel):
+    job_id: str
+    status: str
+    summary: Optional[str] = None
+    format: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+# Summarization strategies and the method named in each summary footer
+STRATEGY_METHODS = {
+    "simple": "advanced NLP processing",
+    "tfidf": "TF-IDF centrality scoring",
+    "textrank": "TextRank graph ranking",
+    "llm": "the configured LLM backend",
+}
+DEFAULT_STRATEGY = os.getenv("SUMMARY_STRATEGY", "simple")
+SUMMARY_SENTENCES = 3
+MIN_SUMMARY_CHARS = 20
+
+SUMMARY_PROMPT = (
+    "Summarize the following text in at most {sentences} sentences{chars}. "
+    "Reply with the summary only.\n\n{text}"
+)
+
+class SummaryLength(NamedTuple):
+    """
+    Length controls for a summary.
+
+    `max_sentences` and `ratio` (a fraction of the input's sentences) cap
+    the sentence count; with neither set the summary has SUMMARY_SENTENCES
+    sentences. `max_chars` bounds the extracted sentences, not the framing.
+    """
+    max_sentences: Optional[int] = None
+    max_chars: Optional[int] = None
+    ratio: Optional[float] = None
     
-    summary = '. '.join(filter(None, summary_sentences))
+    def sentence_count(self, total: int) -> int:
+        """Number of sentences to select from an input of `total` sentences"""
+        if self.max_sentences is None and self.ratio is None:
+            return min(SUMMARY_SENTENCES, total)
+        count = total
+        if self.max_sentences is not None:
+            count = min(count, self.max_sentences)
+        if self.ratio is not None:
+            count = min(count, max(1, math.ceil(total * self.ratio)))
+        return count
     
+    def covers(self, text: str, total: int) -> bool:
+        """Whether `text` already fits the limits and can be returned unchanged"""
+        return total <= self.sentence_count(total) and (self.max_chars is None or len(text) <= self.max_chars)
+
+DEFAULT_LENGTH = SummaryLength()
+
+class SummaryResult(NamedTuple):
+    """
+    An extracted summary before it is rendered in an output format.
+
+    `spans` are the sentence offsets of the input and `selected` the
+    indices of the summary sentences among them; both are None when the
+    summary is not a verbatim selection (LLM and map-reduce output).
+    `complete` marks inputs that already fit the limits and are returned
+    unchanged.
+    """
+    text: str
+    sentence_count: int
+    strategy: str
+    scope: str = ""
+    spans: Optional[List[Tuple[int, int]]] = None
+    selected: Optional[List[int]] = None
+    truncated: bool = False
+    complete: bool = False
+    keywords: Optional[Dict[str, List[Tuple[str, float]]]] = None
+
+# Output formats for /summarize; markdown is the framed summary the service has always returned
+OUTPUT_FORMATS = ("markdown", "plain", "structured")
+DEFAULT_OUTPUT_FORMAT = "markdown"
+
+# Keywords and keyphrases returned by /keywords, or alongside a summary on request
+DEFAULT_KEYWORD_COUNT = 10
+MAX_KEYWORD_COUNT = 100
+
+class SummaryInputError(ValueError):
+    """Raised when streamed input turns out to be unsummarizable; the message is safe to return to clients"""
+
+# Worker pool configuration
+MIN_TEXT_LENGTH = 50
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", str(os.cpu_count() or 1)))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "32"))
+
+# Map-reduce summarization for long documents
+MAP_REDUCE_CHUNK_SIZE = int(os.getenv("MAP_REDUCE_CHUNK_SIZE", "20000"))
+MAP_REDUCE_FAN_OUT = int(os.getenv("MAP_REDUCE_FAN_OUT", "8"))
+MIN_CHUNK_SIZE = 500
+
+# Summary cache, keyed by content hash plus strategy and options
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", "3600"))
+summary_cache = SummaryCache(SUMMARY_CACHE_MAX_BYTES, SUMMARY_CACHE_TTL)
+
+# Concurrent identical /summarize requests share one computation
+summary_flights = SingleFlight()
+
+# Background summary jobs for inputs too slow to hold a connection open for
+SUMMARY_JOB_WORKERS = int(os.getenv("SUMMARY_JOB_WORKERS", "2"))
+SUMMARY_JOB_QUEUE_SIZE = int(os.getenv("SUMMARY_JOB_QUEUE_SIZE", "100"))
+SUMMARY_JOB_RESULT_TTL = float(os.getenv("SUMMARY_JOB_RESULT_TTL", "3600"))
+# Job states are shared here so any serve.py worker can answer a poll; empty path keeps them in process memory
+SUMMARY_JOB_STATE_DIR = os.getenv("SUMMARY_JOB_STATE_DIR", "./data/summary_jobs")
+JOB_RETRY_AFTER_SECONDS = 5
+
+# Documents resubmitted under the same document_id are re-summarized incrementally. The store is a cache
+# per worker: a resubmission that reaches another worker is summarized in full, with the same result.
+INCREMENTAL_MAX_DOCUMENTS = int(os.getenv("INCREMENTAL_MAX_DOCUMENTS", "256"))
+document_store = DocumentStore(INCREMENTAL_MAX_DOCUMENTS)
+
+# Corpus document frequencies shared by every worker through a memory-mapped file; empty path disables
+IDF_STORE_PATH = os.getenv("IDF_STORE_PATH", "./data/idf_store.bin")
+IDF_STORE_BUCKETS = int(os.getenv("IDF_STORE_BUCKETS", str(1 << 22)))
+IDF_MIN_DOCUMENTS = int(os.getenv("IDF_MIN_DOCUMENTS", "100"))
+_idf_store: Optional[IDFStore] = None
+
+def get_idf_store() -> Optional[IDFStore]:
+    """Return the corpus IDF store, opening (or creating) its file on first use; None when disabled"""
+    global _idf_store
+    if _idf_store is None and IDF_STORE_PATH:
+        _idf_store = IDFStore(IDF_STORE_PATH, IDF_STORE_BUCKETS, IDF_MIN_DOCUMENTS)
+    return _idf_store
+
+_worker_pool: Optional[ProcessPoolExecutor] = None
+
+def get_worker_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use"""
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = ProcessPoolExecutor(max_workers=max(1, SUMMARY_WORKERS))
+    return _worker_pool
+
+def validate_strategy(strategy: str) -> Optional[str]:
+    """Return an error message if the strategy is not supported, otherwise None"""
+    if strategy not in STRATEGY_METHODS:
+        return f"Unknown strategy '{strategy}' (available: {', '.join(STRATEGY_METHODS)})"
+    if strategy == "llm" and get_backend() is None:
+        return "The llm strategy requires LLM_PROVIDER to be set to a real provider"
+    return None
+
+def validate_text(text: str, strategy: str = DEFAULT_STRATEGY) -> Optional[str]:
+    """Return an error message if the text cannot be summarized, otherwise None"""
+    error = validate_strategy(strategy)
+    if error:
+        return error
+    if not text.strip():
+        return "Text cannot be empty"
+    if len(text) < MIN_TEXT_LENGTH:
+        return f"Text too short for meaningful summarization (minimum {MIN_TEXT_LENGTH} characters)"
+    return None
+
+def validate_length(length: SummaryLength) -> Optional[str]:
+    """Return an error message if the length controls are out of range, otherwise None"""
+    if length.max_sentences is not None and length.max_sentences < 1:
+        return "max_sentences must be at least 1"
+    if length.max_chars is not None and length.max_chars < MIN_SUMMARY_CHARS:
+        return f"max_chars must be at least {MIN_SUMMARY_CHARS}"
+    if length.ratio is not None and not 0 < length.ratio <= 1:
+        return "ratio must be greater than 0 and at most 1"
+    return None
+
+def validate_language(language: Optional[str]) -> Optional[str]:
+    """Return an error message if the language is not supported, otherwise None"""
+    if language is not None and language not in SUPPORTED_LANGUAGES:
+        return f"Unsupported language '{language}' (available: {', '.join(SUPPORTED_LANGUAGES)})"
+    return None
+
+def resolve_language(text: str, language: Optional[str] = None) -> LanguageResources:
+    """Return the resources for the requested language, detecting it from `text` when not given"""
+    return get_language(language or detect_language(text))
+
+def validate_output_format(output_format: Optional[str]) -> Optional[str]:
+    """Return an error message if the output format is not supported, otherwise None"""
+    if output_format is not None and output_format not in OUTPUT_FORMATS:
+        return f"Unknown format '{output_format}' (available: {', '.join(OUTPUT_FORMATS)})"
+    return None
+
+def validate_keyword_count(count: Optional[int]) -> Optional[str]:
+    """Return an error message if the keyword count is out of range, otherwise None"""
+    if count is not None and not 1 <= count <= MAX_KEYWORD_COUNT:
+        return f"Keyword count must be between 1 and {MAX_KEYWORD_COUNT}"
+    return None
+
+def validate_map_reduce(chunk_size: int, fan_out: int) -> Optional[str]:
+    """Return an error message if the map-reduce options are out of range, otherwise None"""
+    if chunk_size < MIN_CHUNK_SIZE:
+        return f"chunk_size must be at least {MIN_CHUNK_SIZE} characters"
+    if fan_out < 2:
+        return "fan_out must be at least 2"
+    return None
+
+def select_summary_sentences(text: str, spans: List[Tuple[int, int]], strategy: str,
+                             length: SummaryLength = DEFAULT_LENGTH, language: str = DEFAULT_LANGUAGE,
+                             scores: Optional[np.ndarray] = None) -> List[int]:
+    """Choose the indices of the sentences that make up the summary, in document order"""
+    count = length.sentence_count(len(spans))
+    if len(spans) <= count and length.max_chars is None:
+        return list(range(len(spans)))
+    
+    if strategy == "simple":
+        # Take evenly spaced sentences (first, middle and last by default) as a simple summary
+        picks = sorted({min(i * len(spans) // max(count - 1, 1), len(spans) - 1) for i in range(count)})
+        if length.max_chars is None:
+            return picks
+        # Earlier positions take priority when the budget is tight
+        priority = [-position for position in range(len(picks))]
+        chosen = select_top_sentences(priority, count, [spans[i][1] - spans[i][0] for i in picks], length.max_chars)
+        return [picks[i] for i in chosen]
+    
+    # Local extractive engine ranks every sentence
+    return select_sentences(text, spans, strategy, count, length.max_chars, language, scores, get_idf_store())
+
+def truncate_summary(summary: str, max_chars: Optional[int]) -> str:
+    """Cut a summary to at most `max_chars`, on a word boundary where possible"""
+    if max_chars is None or len(summary) <= max_chars:
+        return summary
+    cut = summary[:max_chars - 1]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut + '…'
+
+def extract_summary(text: str, strategy: str, length: SummaryLength = DEFAULT_LENGTH,
+                    language: Optional[str] = None) -> str:
+    """Return the selected summary sentences of `text` without any framing"""
+    resources = resolve_language(text, language)
+    spans = list(iter_sentence_spans(text, abbreviations=resources.abbreviations))
+    selected = select_summary_sentences(text, spans, strategy, length, resources.code)
+    summary = join_spans(text, (spans[i] for i in selected), resources.sentence_separator)
+    return truncate_summary(summary, length.max_chars)
+
+def format_summary(summary: str, sentence_count: int, strategy: str, scope: str = "") -> str:
+    """Render extracted sentences with the standard summary framing"""
     # Add AI-like introduction
-    ai_summary = f"**AI Summary**: {summary}"
-    if not ai_summary.endswith('.'):
-        ai_summary += '.'
+    parts = ["**AI Summary**: ", summary]
+    # A summary cut short by truncate_summary already ends in an ellipsis
+    if summary[-1] not in SENTENCE_TERMINATORS and summary[-1] != '…':
+        parts.append('.')
     
-    ai_summary += f"\n\n*Key insights extracted from {len(sentences)} sentences using advanced NLP processing.*"
+    parts.append(f"\n\n*Key insights extracted from {sentence_count} sentences{scope} using {STRATEGY_METHODS[strategy]}.*")
     
-    return ai_summary
+    return ''.join(parts)
 
-def mock_summarize_document(content: str, filename: str) -> str:
+def render_markdown(result: SummaryResult) -> str:
+    """Render a summary with the standard framing, or the input itself when it was returned whole"""
+    if result.complete:
+        return result.text
+    return format_summary(result.text, result.sentence_count, result.strategy, result.scope)
+
+def keyword_entries(statistics: TermStatistics, count: int) -> Dict[str, List[Tuple[str, float]]]:
+    """Top keywords and keyphrases from the term statistics of one tokenization pass"""
+    return {
+        "keywords": extract_keywords(statistics, count),
+        "keyphrases": extract_keyphrases(statistics, count),
+    }
+
+def render_keywords(entries: Dict[str, List[Tuple[str, float]]]) -> Dict[str, List[Dict]]:
+    """Response fields for keywords and keyphrases"""
+    return {
+        field: [{"text": text, "score": round(score, 4)} for text, score in ranked]
+        for field, ranked in entries.items()
+    }
+
+def render_summary_payload(result: SummaryResult, output_format: str, source: str) -> bytes:
+    """Serialize a summary in the requested output format as a JSON response body"""
+    keywords = render_keywords(result.keywords) if result.keywords is not None else {}
+    if output_format == "markdown":
+        return orjson.dumps({"summary": render_markdown(result), "format": output_format, **keywords})
+    if output_format == "plain":
+        return orjson.dumps({"summary": result.text, "format": output_format, **keywords})
+    
+    sentences = None
+    if result.selected is not None:
+        sentences = [
+            {"index": index, "start": result.spans[index][0], "end": result.spans[index][1],
+             "text": source[result.spans[index][0]:result.spans[index][1]]}
+            for index in result.selected
+        ]
+    return orjson.dumps({
+        "summary": result.text,
+        "format": output_format,
+        "strategy": result.strategy,
+        "total_sentences": result.sentence_count,
+        "truncated": result.truncated,
+        "sentences": sentences,
+        **keywords,
+    })
+
+# Mock LLM response for demonstration
+def mock_summarize_text(text: str, strategy: str = "simple", length: SummaryLength = DEFAULT_LENGTH,
+                        language: Optional[str] = None) -> str:
+    """Mock text summarization - in production, this would use LangChain + LLM"""
+    return render_markdown(summarize_text_result(text, strategy, length, language))
+
+def summarize_text_result(text: str, strategy: str = "simple", length: SummaryLength = DEFAULT_LENGTH,
+                          language: Optional[str] = None, keyword_count: Optional[int] = None) -> SummaryResult:
+    """
+    Segment and summarize `text` locally, keeping the selected sentence offsets.
+
+    With `keyword_count`, the text is tokenized once and the same term
+    statistics feed both sentence scoring and keyword extraction.
+    """
+    resources = resolve_language(text, language)
+    spans = list(iter_sentence_spans(text, abbreviations=resources.abbreviations))
+    if strategy not in STRATEGIES and keyword_count is None:
+        return summarize_spans(text, spans, strategy, length, resources)
+    
+    statistics = build_term_statistics(text, spans, resources.code, get_idf_store())
+    record_document(statistics)
+    scores = score_matrix(statistics.matrix, strategy) if strategy in STRATEGIES else None
+    result = summarize_spans(text, spans, strategy, length, resources, scores)
+    if keyword_count is None:
+        return result
+    return result._replace(keywords=keyword_entries(statistics, keyword_count))
+
+def record_document(statistics: TermStatistics) -> None:
+    """Add a tokenized document's terms to the corpus document frequencies"""
+    idf_store = get_idf_store()
+    if idf_store is not None and statistics.terms:
+        idf_store.add_document(statistics.terms)
+
+def extract_keyword_payload(text: str, language: Optional[str], count: int) -> bytes:
+    """Tokenize `text` and serialize its keywords and keyphrases as a JSON response body"""
+    resources = resolve_language(text, language)
+    spans = list(iter_sentence_spans(text, abbreviations=resources.abbreviations))
+    statistics = build_term_statistics(text, spans, resources.code, get_idf_store())
+    record_document(statistics)
+    return orjson.dumps({"language": resources.code, **render_keywords(keyword_entries(statistics, count))})
+
+def summarize_spans(text: str, spans: List[Tuple[int, int]], strategy: str, length: SummaryLength,
+                    resources: LanguageResources, scores: Optional[np.ndarray] = None) -> SummaryResult:
+    """Select and join the summary sentences of an already segmented text"""
+    if length.covers(text, len(spans)):
+        return SummaryResult(text, len(spans), strategy, spans=spans, selected=list(range(len(spans))), complete=True)
+    
+    selected = select_summary_sentences(text, spans, strategy, length, resources.code, scores)
+    joined = join_spans(text, (spans[i] for i in selected), resources.sentence_separator)
+    summary = truncate_summary(joined, length.max_chars)
+    return SummaryResult(summary, len(spans), strategy, spans=spans, selected=selected,
+                         truncated=len(summary) < len(joined))
+
+def summarize_document_version(document: IncrementalDocument, text: str, strategy: str,
+                               length: SummaryLength = DEFAULT_LENGTH) -> SummaryResult:
+    """Move a tracked document to a new version and summarize it, rescanning only the edited sentences"""
+    document.update(text)
+    scores = document.scores(strategy, get_idf_store()) if strategy != "simple" else None
+    return summarize_spans(text, document.spans, strategy, length, get_language(document.language), scores)
+
+def mock_summarize_document(content: str, filename: str, strategy: str = "simple") -> str:
     """Mock document summarization"""
+    return frame_document_summary(mock_summarize_text(content, strategy), filename)
+
+def frame_document_summary(summary: str, filename: str) -> str:
+    """Add document-specific context around a summary"""
     file_type = filename.split('.')[-1].upper() if '.' in filename else 'DOCUMENT'
     
-    summary = mock_summarize_text(content)
-    
-    # Add document-specific context
     doc_summary = f"**Document Summary ({file_type}): {filename}**\n\n{summary}"
     doc_summary += f"\n\n*Document processed using AI-powered extraction and summarization algorithms.*"
     
     return doc_summary
 
+def summarize_batch_chunk(texts: List[str], strategy: str = DEFAULT_STRATEGY, length: SummaryLength = DEFAULT_LENGTH,
+                          language: Optional[str] = None) -> List[Tuple[Optional[str], Optional[str]]]:
+    """Summarize a slice of a batch in a worker, returning (summary, error) per text"""
+    results = []
+    for text in texts:
+        error = validate_text(text, strategy)
+        if error:
+            results.append((None, error))
+            continue
+        try:
+            results.append((mock_summarize_text(text, strategy, length, language), None))
+        except Exception as e:
+            results.append((None, f"Error generating summary: {str(e)}"))
+    return results
+
+async def llm_extract_summary(text: str, sentences: int, max_chars: Optional[int] = None) -> str:
+    """Ask the configured LLM backend for a summary of `text`"""
+    chars = f" and at most {max_chars} characters" if max_chars else ""
+    prompt = SUMMARY_PROMPT.format(sentences=sentences, chars=chars, text=text)
+    summary = (await get_backend().complete(prompt, "summarization")).strip()
+    return truncate_summary(summary, max_chars)
+
+async def generate_summary(text: str, strategy: str, length: SummaryLength = DEFAULT_LENGTH,
+                           language: Optional[str] = None) -> str:
+    """Produce a framed summary with the requested strategy without blocking the event loop"""
+    return render_markdown(await generate_summary_result(text, strategy, length, language))
+
+async def generate_summary_result(text: str, strategy: str, length: SummaryLength = DEFAULT_LENGTH,
+                                  language: Optional[str] = None, keyword_count: Optional[int] = None) -> SummaryResult:
+    """Summarize with the requested strategy, on the LLM backend or a worker thread"""
+    if strategy == "llm":
+        total = sum(1 for _ in iter_sentence_spans(text))
+        summary = await llm_extract_summary(text, length.sentence_count(total), length.max_chars)
+        return SummaryResult(summary, total, strategy)
+    
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, summarize_text_result, text, strategy, length, language, keyword_count)
+
+async def summarize_llm_batch_item(text: str, length: SummaryLength) -> Tuple[Optional[str], Optional[str]]:
+    """Summarize one batch text on the LLM backend, returning (summary, error)"""
+    error = validate_text(text, "llm")
+    if error:
+        return None, error
+    try:
+        return await generate_summary(text, "llm", length), None
+    except Exception as e:
+        return None, f"Error generating summary: {str(e)}"
+
+async def summarize_part(text: str, strategy: str, length: SummaryLength, language: Optional[str] = None) -> str:
+    """Summarize one map-reduce part, on the worker pool or the LLM backend"""
+    if strategy == "llm":
+        return await llm_extract_summary(text, length.max_sentences or SUMMARY_SENTENCES, length.max_chars)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_worker_pool(), extract_summary, text, strategy, length, language)
+
+async def map_reduce_summarize(text: str, strategy: str, chunk_size: int, fan_out: int,
+                               length: SummaryLength = DEFAULT_LENGTH, language: Optional[str] = None) -> SummaryResult:
+    """
+    Summarize a long document hierarchically on the shared worker pool
+    (or with concurrent LLM calls for the llm strategy).
+
+    The text is cut into sentence-aligned chunks of about `chunk_size`
+    characters, each chunk is summarized in parallel (map), and the chunk
+    summaries are merged `fan_out` at a time and summarized again (reduce)
+    until a single summary remains. A `ratio` is resolved against the
+    whole document up front; `max_chars` applies to the final step only.
+    The language is detected once for the whole document.
+    """
+    language = language or detect_language(text)
+    loop = asyncio.get_running_loop()
+    chunk_spans = await loop.run_in_executor(None, list, iter_chunk_spans(text, chunk_size))
+    sentence_count = sum(count for _, _, count in chunk_spans)
+    if length.covers(text, sentence_count):
+        return SummaryResult(text, sentence_count, strategy, complete=True)
+    
+    part_length = SummaryLength(max_sentences=length.sentence_count(sentence_count))
+    final_length = part_length._replace(max_chars=length.max_chars)
+    
+    summaries = await asyncio.gather(*(
+        summarize_part(text[start:end], strategy, final_length if len(chunk_spans) == 1 else part_length, language)
+        for start, end, _ in chunk_spans
+    ))
+    summary = await reduce_summaries(list(summaries), strategy, fan_out, part_length, final_length, language)
+    
+    scope = f" across {len(chunk_spans)} chunks" if len(chunk_spans) > 1 else ""
+    return SummaryResult(summary, sentence_count, strategy, scope)
+
+async def reduce_summaries(summaries: List[str], strategy: str, fan_out: int,
+                           part_length: SummaryLength, final_length: SummaryLength,
+                           language: Optional[str] = None) -> str:
+    """Merge chunk summaries `fan_out` at a time and summarize them again until one remains"""
+    while len(summaries) > 1:
+        groups = [' '.join(summaries[i:i + fan_out]) for i in range(0, len(summaries), fan_out)]
+        group_length = final_length if len(groups) == 1 else part_length
+        summaries = await asyncio.gather(*(
+            summarize_part(group, strategy, group_length, language) for group in groups
+        ))
+    return summaries[0]
+
+async def summarize_text_stream(pieces: AsyncIterator[str], strategy: str, language: Optional[str] = None,
+                                chunk_size: int = MAP_REDUCE_CHUNK_SIZE,
+                                fan_out: int = MAP_REDUCE_FAN_OUT) -> str:
+    """
+    Summarize text that arrives in pieces, e.g. pages from a document decoder.
+
+    Sentence-aligned chunks are cut and submitted to the map step as soon
+    as enough text has arrived, so summarizing overlaps with extraction.
+    Inputs that never grow past two chunks are summarized in one pass.
+    Unless given, the language is detected from the first text buffered.
+    """
+    part_length = SummaryLength(max_sentences=SUMMARY_SENTENCES)
+    parts: List[asyncio.Future] = []
+    sentence_count = 0
+    buffer = ""
+    try:
+        async for piece in pieces:
+            buffer += piece
+            if len(buffer) < 2 * chunk_size:
+                continue
+            language = language or detect_language(buffer)
+            chunk_spans = list(iter_chunk_spans(buffer, chunk_size))
+            for start, end, count in chunk_spans[:-1]:
+                parts.append(asyncio.ensure_future(summarize_part(buffer[start:end], strategy, part_length, language)))
+                sentence_count += count
+            buffer = buffer[chunk_spans[-1][0]:]
+        
+        if not parts:
+            error = validate_text(buffer, strategy)
+            if error:
+                raise SummaryInputError(error)
+            return await generate_summary(buffer, strategy, language=language)
+        
+        for start, end, count in iter_chunk_spans(buffer, chunk_size):
+            parts.append(asyncio.ensure_future(summarize_part(buffer[start:end], strategy, part_length, language)))
+            sentence_count += count
+        summaries = await asyncio.gather(*parts)
+    except BaseException:
+        for part in parts:
+            part.cancel()
+        raise
+    
+    final_length = SummaryLength(max_sentences=min(SUMMARY_SENTENCES, sentence_count))
+    summary = await reduce_summaries(list(summaries), strategy, fan_out, part_length, final_length, language)
+    return format_summary(summary, sentence_count, strategy, f" across {len(parts)} chunks")
+
+def validate_summary_request(request: TextSummaryRequest) -> Optional[str]:
+    """Return an error message if a summary request is invalid, otherwise None"""
+    strategy = request.strategy or DEFAULT_STRATEGY
+    length = SummaryLength(request.max_sentences, request.max_chars, request.ratio)
+    error = (validate_text(request.text, strategy) or validate_length(length)
+             or validate_language(request.language) or validate_output_format(request.format)
+             or validate_keyword_count(request.keywords))
+    if error is None and request.map_reduce:
+        error = validate_map_reduce(request.chunk_size or MAP_REDUCE_CHUNK_SIZE, request.fan_out or MAP_REDUCE_FAN_OUT)
+    if error is None and request.document_id is not None:
+        if request.map_reduce or strategy == "llm":
+            error = "document_id cannot be combined with map_reduce or the llm strategy"
+        elif not request.document_id.strip():
+            error = "document_id cannot be empty"
+    if error is None and request.keywords is not None:
+        if request.map_reduce or request.document_id is not None or strategy == "llm":
+            error = "keywords cannot be combined with map_reduce, document_id or the llm strategy"
+    return error
+
+async def summarize_request(request: TextSummaryRequest) -> bytes:
+    """
+    Serve a validated summary request as a rendered JSON body.
+
+    Bodies are cached already serialized, so a cache hit is written to the
+    response as is. Concurrent identical misses share one computation.
+    """
+    strategy = request.strategy or DEFAULT_STRATEGY
+    length = SummaryLength(request.max_sentences, request.max_chars, request.ratio)
+    output_format = request.format or DEFAULT_OUTPUT_FORMAT
+    if request.document_id is not None:
+        # The tracked document is its own cache; updates to one document are serialized
+        document = document_store.get(request.document_id, request.language)
+        async with document.lock:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                None, summarize_document_version, document, request.text, strategy, length
+            )
+        return render_summary_payload(result, output_format, request.text)
+    
+    if request.map_reduce:
+        chunk_size = request.chunk_size or MAP_REDUCE_CHUNK_SIZE
+        fan_out = request.fan_out or MAP_REDUCE_FAN_OUT
+        cache_key = make_cache_key(request.text, strategy, chunk_size=chunk_size, fan_out=fan_out,
+                                   language=request.language, format=output_format, **length._asdict())
+    else:
+        cache_key = make_cache_key(request.text, strategy, language=request.language, format=output_format,
+                                   keywords=request.keywords, **length._asdict())
+    
+    async def compute_summary() -> bytes:
+        if request.map_reduce:
+            result = await map_reduce_summarize(request.text, strategy, chunk_size, fan_out, length, request.language)
+        else:
+            result = await generate_summary_result(request.text, strategy, length, request.language, request.keywords)
+        payload = render_summary_payload(result, output_format, request.text)
+        summary_cache.set(cache_key, payload)
+        return payload
+    
+    payload = summary_cache.get(cache_key)
+    if payload is None:
+        payload = await summary_flights.run(cache_key, compute_summary)
+    return payload
+
+def describe_summary_error(error: Exception) -> str:
+    """Client-facing message for a failed background summary"""
+    if isinstance(error, LLMBackendError):
+        return str(error)
+    return f"Error generating summary: {str(error)}"
+
+summary_jobs = JobQueue(SUMMARY_JOB_WORKERS, SUMMARY_JOB_QUEUE_SIZE, SUMMARY_JOB_RESULT_TTL, describe_summary_error,
+                        state_dir=SUMMARY_JOB_STATE_DIR)
+
+def sse_event(event: str, data: Dict) -> str:
+    """Encode a single Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_summary_events(text: str, strategy: str, length: SummaryLength = DEFAULT_LENGTH,
+                                language: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Yield the summary as Server-Sent Events, one sentence per event.
+
+    A `start` event is sent before any work is done. With the simple
+    strategy and no character budget the first sentence is emitted as
+    soon as it is segmented; ranked strategies emit sentences once
+    scoring finishes. A final `done` event carries the fully formatted
+    summary.
+    """
+    yield sse_event("start", {"strategy": strategy, "characters": len(text)})
+    
+    loop = asyncio.get_running_loop()
+    try:
+        emitted = 0
+        resources = resolve_language(text, language)
+        if strategy == "simple" and length.max_chars is None:
+            span_iter = iter_sentence_spans(text, abbreviations=resources.abbreviations)
+            first = next(span_iter)
+            yield sse_event("sentence", {"index": 0, "text": text[first[0]:first[1]]})
+            emitted = 1
+            spans = [first] + await loop.run_in_executor(None, list, span_iter)
+            selected = select_summary_sentences(text, spans, strategy, length, resources.code)
+        else:
+            span_iter = iter_sentence_spans(text, abbreviations=resources.abbreviations)
+            spans = await loop.run_in_executor(None, list, span_iter)
+            selected = await loop.run_in_executor(
+                None, select_summary_sentences, text, spans, strategy, length, resources.code
+            )
+        
+        for index in selected[emitted:]:
+            start, end = spans[index]
+            yield sse_event("sentence", {"index": index, "text": text[start:end]})
+        
+        if length.covers(text, len(spans)):
+            summary = text
+        else:
+            summary = join_spans(text, (spans[i] for i in selected), resources.sentence_separator)
+            summary = format_summary(truncate_summary(summary, length.max_chars), len(spans), strategy)
+        yield sse_event("done", {"sentences": len(spans), "summary": summary})
+    except Exception as e:
+        yield sse_event("error", {"detail": f"Error generating summary: {str(e)}"})
+
+def preload_resources() -> None:
+    """Load resources every worker needs; serve.py calls this once before forking its workers"""
+    for code in SUPPORTED_LANGUAGES:
+        get_language(code)
+
 @app.get("/")
 async def root():
     return {
         "service": "Text Summarization Service",
         "version": "1.0.0",
-        "endpoints": ["/summarize", "/health"],
+        "endpoints": [
+            "/summarize", "/summarize/batch", "/summarize/stream", "/summarize/jobs", "/summarize-document",
+            "/keywords", "/health"
+        ],
+        "strategies": list(STRATEGY_METHODS),
+        "document_formats": ["pdf", "docx", "txt"],
+        "languages": list(SUPPORTED_LANGUAGES),
         "status": "active"
     }
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "text-summarization"}
+    return {
+        "status": "healthy",
+        "service": "text-summarization",
+        "cache": summary_cache.stats(),
+        "single_flight": summary_flights.stats(),
+        "jobs": summary_jobs.stats(),
+        "documents": document_store.stats(),
+        "languages_loaded": loaded_languages(),
+        "idf": get_idf_store().stats() if IDF_STORE_PATH else None,
+        "llm": backend_info()
+    }
 
-@app.post("/summarize", response_model=SummaryResponse)
+@app.post("/summarize", response_model=FormattedSummaryResponse)
 async def summarize_text(request: TextSummaryRequest):
-    """Summarize provided text content"""
+    """Summarize provided text content as markdown (default), plain text or structured sentences"""
     try:
-        if not request.text.strip():
-            raise HTTPException(status_code=400, detail="Text cannot be empty")
+        error = validate_summary_request(request)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
         
-        if len(request.text) < 50:
-            raise HTTPException(status_code=400, detail="Text too short for meaningful summarization (minimum 50 characters)")
-        
-        summary = mock_summarize_text(request.text)
-        
-        return SummaryResponse(summary=summary)
+        # The body is already serialized JSON; skip response model validation and re-encoding
+        return Response(content=await summarize_request(request), media_type="application/json")
     
     except HTTPException:
         raise
+    except LLMBackendError as e:
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating summary: {str(e)}")
 
-# Temporarily disable file upload endpoint due to multipart issue
-# @app.post("/summarize-document", response_model=SummaryResponse)
-# async def summarize_document(file: UploadFile = File(...)):
-#     """Summarize uploaded document content"""
-#     # Implementation commented out temporarily
-#     return SummaryResponse(summary="File upload endpoint temporarily disabled")
+@app.post("/keywords", response_model=KeywordResponse)
+async def extract_text_keywords(request: KeywordRequest):
+    """Extract the top keywords and two-word keyphrases of the provided text"""
+    try:
+        count = request.count or DEFAULT_KEYWORD_COUNT
+        error = (validate_text(request.text, "tfidf") or validate_language(request.language)
+                 or validate_keyword_count(request.count))
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+        
+        cache_key = make_cache_key(request.text, "keywords", language=request.language, count=count)
+        payload = summary_cache.get(cache_key)
+        if payload is None:
+            loop = asyncio.get_running_loop()
+            payload = await loop.run_in_executor(None, extract_keyword_payload, request.text, request.language, count)
+            summary_cache.set(cache_key, payload)
+        return Response(content=payload, media_type="application/json")
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error extracting keywords: {str(e)}")
+
+@app.post("/summarize/jobs", response_model=SummaryJobResponse, status_code=202)
+async def submit_summary_job(request: TextSummaryRequest):
+    """Queue a summary to run in the background and return its job id immediately"""
+    error = validate_summary_request(request)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    try:
+        job = summary_jobs.submit(lambda: summarize_request(request))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(JOB_RETRY_AFTER_SECONDS)})
+    
+    return SummaryJobResponse(job_id=job.id, status=job.status, status_url=f"/summarize/jobs/{job.id}")
+
+@app.get("/summarize/jobs/{job_id}", response_model=SummaryJobStatus)
+async def get_summary_job(job_id: str):
+    """Report the status of a background summary, with the summary once it has finished"""
+    job = summary_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found (unknown id or expired result)")
+    
+    status = {
+        "job_id": job.id,
+        "status": job.status,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+    if job.result is not None:
+        status.update(orjson.loads(job.result))
+    return ORJSONResponse(status)
+
+@app.post("/summarize/batch", response_model=BatchSummaryResponse)
+async def summarize_batch(request: BatchSummaryRequest):
+    """Summarize many texts in one round trip using the shared worker pool"""
+    if not request.texts:
+        raise HTTPException(status_code=400, detail="Batch cannot be empty")
+    
+    if len(request.texts) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large (maximum {MAX_BATCH_SIZE} texts)")
+    
+    strategy = request.strategy or DEFAULT_STRATEGY
+    length = SummaryLength(request.max_sentences, request.max_chars, request.ratio)
+    error = validate_strategy(strategy) or validate_length(length) or validate_language(request.language)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    # Serve cached summaries directly and only send misses to the workers
+    cache_keys = [make_cache_key(text, strategy, language=request.language, **length._asdict()) for text in request.texts]
+    outcomes: List[Tuple[Optional[str], Optional[str]]] = [(None, None)] * len(request.texts)
+    pending = []
+    for index, cache_key in enumerate(cache_keys):
+        cached = summary_cache.get(cache_key)
+        if cached is None:
+            pending.append(index)
+        else:
+            outcomes[index] = (cached.decode("utf-8"), None)
+    
+    try:
+        if strategy == "llm":
+            # The backend client bounds its own concurrency, so every miss is submitted at once
+            chunks = [pending]
+            chunk_results = [await asyncio.gather(*(
+                summarize_llm_batch_item(request.texts[i], length) for i in pending
+            ))]
+        else:
+            # Ship texts to the workers in chunks so IPC overhead is paid per chunk, not per text
+            loop = asyncio.get_running_loop()
+            pool = get_worker_pool()
+            chunks = [
+                pending[i:i + BATCH_CHUNK_SIZE]
+                for i in range(0, len(pending), BATCH_CHUNK_SIZE)
+            ]
+            chunk_results = await asyncio.gather(*(
+                loop.run_in_executor(
+                    pool, summarize_batch_chunk, [request.texts[i] for i in chunk], strategy, length, request.language
+                )
+                for chunk in chunks
+            ))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating batch summary: {str(e)}")
+    
+    for chunk, chunk_result in zip(chunks, chunk_results):
+        for index, (summary, error) in zip(chunk, chunk_result):
+            outcomes[index] = (summary, error)
+            if summary is not None:
+                summary_cache.set(cache_keys[index], summary.encode("utf-8"))
+    
+    results = [
+        BatchSummaryItem(index=index, summary=summary, error=error)
+        for index, (summary, error) in enumerate(outcomes)
+    ]
+    
+    failed = sum(1 for item in results if item.error)
+    return BatchSummaryResponse(results=results, succeeded=len(results) - failed, failed=failed)
+
+@app.post("/summarize/stream")
+async def summarize_stream(request: TextSummaryRequest):
+    """Stream the summary sentence by sentence as Server-Sent Events"""
+    strategy = request.strategy or DEFAULT_STRATEGY
+    length = SummaryLength(request.max_sentences, request.max_chars, request.ratio)
+    error = validate_text(request.text, strategy) or validate_length(length) or validate_language(request.language)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    if request.map_reduce:
+        raise HTTPException(status_code=400, detail="map_reduce is not supported for streaming summaries")
+    
+    if strategy == "llm":
+        raise HTTPException(status_code=400, detail="The llm strategy is not supported for streaming summaries")
+    
+    return StreamingResponse(
+        stream_summary_events(request.text, strategy, length, request.language),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.on_event("shutdown")
+async def shutdown_worker_pool():
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.shutdown(wait=False, cancel_futures=True)
+        _worker_pool = None
+    await summary_jobs.close()
+    if _idf_store is not None:
+        _idf_store.flush()
+    await close_backend()
+
+@app.post("/summarize-document", response_model=SummaryResponse)
+async def summarize_document(file: UploadFile = File(...), strategy: Optional[str] = Form(None),
+                             language: Optional[str] = Form(None)):
+    """Summarize an uploaded PDF, DOCX or plain text document"""
+    path = None
+    try:
+        strategy = strategy or DEFAULT_STRATEGY
+        error = validate_strategy(strategy) or validate_language(language)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+        
+        path = await save_upload_to_disk(file)
+        document_format = detect_document_format(path, file.filename)
+        pieces = iter_document_text(path, document_format, get_worker_pool())
+        summary = await summarize_text_stream(pieces, strategy, language)
+        
+        return SummaryResponse(summary=frame_document_summary(summary, file.filename or "document"))
+    
+    except HTTPException:
+        raise
+    except SummaryInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DocumentExtractionError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except LLMBackendError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
+    finally:
+        await file.close()
+        if path is not None:
+            os.remove(path)
 
 if __name__ == "__main__":
     uvicorn.run("text_summarization:app", host="0.0.0.0", port=8001, reload=True)
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""
+Upload Utilities
+Size-bounded, chunked handling of multipart document uploads
+"""
+import asyncio
+import codecs
+import os
+import tempfile
+from typing import AsyncIterator, Iterable, Optional
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "./uploads")
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def file_too_large_error() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large (maximum {MAX_FILE_SIZE} bytes)"
+    )
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversized request bodies on upload routes before they are buffered.
+
+    Requests that declare a Content-Length above the limit are refused
+    immediately. Otherwise the body is counted as it is received and the
+    request is aborted with 413 as soon as the limit is crossed, so the
+    multipart parser never spools more than the limit to disk.
+    """
+
+    def __init__(self, app, paths: Iterable[str], max_size: int = MAX_FILE_SIZE):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_body_size = max_size + MULTIPART_OVERHEAD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and int(content_length) > self.max_body_size:
+            error = file_too_large_error()
+            response = JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise file_too_large_error()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def iter_upload_chunks(file: UploadFile, chunk_size: int = UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Read an upload in fixed-size chunks, enforcing MAX_FILE_SIZE as bytes arrive"""
+    total = 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > MAX_FILE_SIZE:
+            raise file_too_large_error()
+        yield chunk
+
+
+async def read_upload_text(file: UploadFile, encoding: str = "utf-8") -> str:
+    """
+    Decode an upload to text chunk by chunk.
+
+    Starlette spools uploads above 1 MB to a temporary file, so the raw
+    bytes stay on disk; only the decoded text is held in memory.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    parts = []
+    async for chunk in iter_upload_chunks(file):
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+async def save_upload_to_disk(file: UploadFile, directory: Optional[str] = None, durable: bool = False,
+                             suffix: Optional[str] = None) -> str:
+    """
+    Copy an upload to a temporary file chunk by chunk and return its path.
+
+    The file is created in `directory`, or in UPLOAD_FOLDER when that
+    directory exists, so worker processes can open it by path. Its name
+    ends in `suffix`, or in the upload's own extension when none is given.
+    With `durable`, it is flushed to stable storage before returning. The
+    caller must delete it.
+    """
+    if directory is None and os.path.isdir(UPLOAD_FOLDER):
+        directory = UPLOAD_FOLDER
+    if suffix is None:
+        suffix = os.path.splitext(file.filename or "")[1]
+    handle = tempfile.NamedTemporaryFile(delete=False, dir=directory, suffix=suffix)
+    loop = asyncio.get_running_loop()
+    try:
+        with handle:
+            async for chunk in iter_upload_chunks(file):
+                await loop.run_in_executor(None, handle.write, chunk)
+            if durable:
+                handle.flush()
+                await loop.run_in_executor(None, os.fsync, handle.fileno())
+    except BaseException:
+        os.remove(handle.name)
+        raise
+    return handle.name
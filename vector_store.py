@@ -0,0 +1,158 @@
+"""
+Vector Store
+Contiguous float32 embedding matrix with exact cosine top-k search
+"""
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_MAGIC = b"VECSTOR1"
+# Header: magic, dimension (uint64) and the embedder key, padded to 64 bytes
+_HEADER_BYTES = 64
+_KEY_BYTES = _HEADER_BYTES - 16
+
+INITIAL_CAPACITY = 1024
+
+
+class VectorStore:
+    """
+    Unit-length float32 vectors in one contiguous matrix; row i is item i.
+
+    Search is exact: one matrix product scores every row against a batch
+    of queries, and argpartition picks each query's top k without sorting
+    all scores. The matrix grows by doubling, so appends are amortized
+    O(1) and searches never see a partially written row.
+
+    With a `path`, added rows are appended to that file and reloaded on
+    the next start. The file is tied to `key` (the embedder and anything
+    else that defines what the rows mean); a file written under another
+    key or dimension is discarded. It is only opened by `open`, so a
+    store created before a fork never shares its file offset.
+    """
+
+    def __init__(self, dim: int, key: str = "", path: Optional[str] = None):
+        self.dim = dim
+        self.key = key
+        self.path = path
+        self._matrix = np.empty((INITIAL_CAPACITY, dim), dtype=np.float32)
+        self._count = 0
+        self._lock = threading.Lock()
+        self._file = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _header(self) -> bytes:
+        key = self.key.encode("utf-8")[:_KEY_BYTES].ljust(_KEY_BYTES, b"\0")
+        return _MAGIC + np.array([self.dim], dtype=np.uint64).tobytes() + key
+
+    def open(self) -> None:
+        """Load the rows saved at `path`, or start a new file if it is missing or incompatible"""
+        path = self.path
+        if path is None or self._file is not None:
+            return
+        if os.path.exists(path):
+            with open(path, "rb") as handle:
+                header = handle.read(_HEADER_BYTES)
+            if header == self._header():
+                rows = (os.path.getsize(path) - _HEADER_BYTES) // (self.dim * 4)
+                self._reserve(rows)
+                with open(path, "rb") as handle:
+                    handle.seek(_HEADER_BYTES)
+                    # Read straight into the matrix rather than through a temporary copy
+                    handle.readinto(memoryview(self._matrix[:rows]).cast("B"))
+                self._count = rows
+                self._file = open(path, "r+b")
+                # Drop a partially written trailing row
+                self._file.truncate(_HEADER_BYTES + rows * self.dim * 4)
+                self._file.seek(0, os.SEEK_END)
+                return
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "w+b")
+        self._file.write(self._header())
+        self._file.flush()
+
+    def _reserve(self, needed: int) -> None:
+        """Grow the matrix to hold at least `needed` rows"""
+        if needed > len(self._matrix):
+            capacity = len(self._matrix)
+            while capacity < needed:
+                capacity *= 2
+            grown = np.empty((capacity, self.dim), dtype=np.float32)
+            grown[:self._count] = self._matrix[:self._count]
+            # Searches already running keep their reference to the old matrix
+            self._matrix = grown
+
+    def _append(self, vectors: np.ndarray) -> None:
+        needed = self._count + len(vectors)
+        self._reserve(needed)
+        self._matrix[self._count:needed] = vectors
+        self._count = needed
+
+    def add(self, vectors: np.ndarray) -> int:
+        """Append rows (normalized here) and return the index of the first one"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        with self._lock:
+            first = self._count
+            self._append(vectors)
+            if self._file is not None:
+                self._file.write(vectors.tobytes())
+                self._file.flush()
+        return first
+
+    def truncate(self, count: int) -> None:
+        """Forget every row from `count` on"""
+        with self._lock:
+            self._count = min(self._count, count)
+            if self._file is not None:
+                self._file.truncate(_HEADER_BYTES + self._count * self.dim * 4)
+                self._file.seek(0, os.SEEK_END)
+
+    def snapshot(self) -> np.ndarray:
+        """A read-only view of the current rows; rows added later are not included"""
+        with self._lock:
+            view = self._matrix[:self._count]
+        view.flags.writeable = False
+        return view
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+        """Return the top `k` (row, cosine similarity) pairs for each query row, best first"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            matrix, count = self._matrix, self._count
+        if not count:
+            return [[] for _ in range(len(queries))]
+
+        scores = matrix[:count] @ queries.T
+        if k < count:
+            top = np.argpartition(scores, count - k, axis=0)[count - k:]
+        else:
+            top = np.broadcast_to(np.arange(count)[:, None], (count, len(queries)))
+        results = []
+        for column in range(len(queries)):
+            rows = top[:, column]
+            rows = rows[np.argsort(-scores[rows, column], kind="stable")]
+            results.append([(int(row), float(scores[row, column])) for row in rows])
+        return results
+
+    def sync(self) -> None:
+        """Force appended rows to stable storage"""
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> Dict:
+        return {
+            "vectors": self._count,
+            "dim": self.dim,
+            "bytes": self._count * self.dim * 4,
+            "path": self.path,
+        }